@@ -1,4 +1,6 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
 import re
 import time
@@ -6,15 +8,37 @@ import json
 from typing import Optional, Dict, List
 from urllib.parse import quote
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Sessão HTTP compartilhada (keep-alive e pool de conexões), criada no primeiro uso
+_SESSION: Optional[requests.Session] = None
+
+def obter_sessao() -> requests.Session:
+    """Retorna a sessão HTTP do processo, criando-a na primeira chamada."""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        _SESSION.mount('https://', adapter)
+        _SESSION.mount('http://', adapter)
+        _SESSION.headers.update({'User-Agent': USER_AGENT})
+    return _SESSION
+
 class CEPFinder:
-    def __init__(self):
+    CEP_RE = re.compile(r'\b\d{5}-?\d{3}\b')
+
+    def __init__(self, cep_re: Optional[re.Pattern] = None):
         self.searxng_url = "http://124.81.6.163:8092/search"
         self.viacep_url = "https://viacep.com.br/ws/{}/json/"
         self.cepaberto_url = "https://www.cepaberto.com/api/v3/cep?cep={}"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.cep_pattern = r'\b\d{5}-?\d{3}\b'
+        self.session = obter_sessao()
+        # Permite reaproveitar um padrão já compilado em outro módulo
+        if cep_re is not None:
+            self.CEP_RE = cep_re
 
     def limpar_texto(self, texto: str) -> str:
         """Limpa o texto removendo caracteres especiais e espaços extras."""
@@ -42,7 +66,7 @@ class CEPFinder:
             if 'results' in resultados:
                 for resultado in resultados['results']:
                     texto = resultado.get('content', '')
-                    cep_match = re.search(self.cep_pattern, texto)
+                    cep_match = self.CEP_RE.search(texto)
                     if cep_match:
                         return cep_match.group(0).replace('-', '')
         except Exception as e:
@@ -52,7 +76,7 @@ class CEPFinder:
     def buscar_via_searxng(self, query: str) -> Optional[str]:
         """Busca CEP usando a API SearXNG."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 self.searxng_url,
                 params={
                     'q': query,
@@ -60,7 +84,6 @@ class CEPFinder:
                     'engines': 'google,bing,duckduckgo',
                     'language': 'pt-BR'
                 },
-                headers=self.headers,
                 timeout=30
             )
             if response.status_code == 200:
@@ -73,9 +96,8 @@ class CEPFinder:
         """Busca CEP usando a API ViaCEP."""
         try:
             endereco_formatado = quote(endereco)
-            response = requests.get(
+            response = self.session.get(
                 f"https://viacep.com.br/ws/{endereco_formatado}/json/",
-                headers=self.headers,
                 timeout=10
             )
             if response.status_code == 200:
@@ -89,9 +111,8 @@ class CEPFinder:
     def buscar_via_cepaberto(self, cep: str) -> Optional[str]:
         """Busca CEP usando a API CEP Aberto."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 self.cepaberto_url.format(cep),
-                headers=self.headers,
                 timeout=10
             )
             if response.status_code == 200:
@@ -132,7 +153,8 @@ class CEPFinder:
                 f"{rua} {estado} CEP"
             ])
 
-        return [v for v in variacoes if v.strip()]
+        # Remove variações vazias e repetidas, mantendo a ordem
+        return [v for v in dict.fromkeys(variacoes) if v.strip()]
 
     def buscar_cep(self, nome: str, endereco: str, cidade: str, estado: str) -> Optional[str]:
         """Busca CEP usando múltiplas estratégias."""
@@ -1,12 +1,48 @@
 import pandas as pd
 import os
+import csv
+
+try:
+    import pyarrow as pa  # Leitura do CSV em C++ (opcional)
+    import pyarrow.csv as pacsv
+except ImportError:
+    pacsv = None
+
+# Textos lidos como nulos pelo pyarrow (os mesmos que o read_csv do pandas usa por padrão)
+VALORES_NULOS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+                 '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+def ler_csv_como_texto(arquivo_csv):
+    """Lê o CSV com todas as colunas como texto (com pyarrow, se disponível)"""
+    if pacsv is None:
+        return pd.read_csv(arquivo_csv, dtype=str)
+    
+    # Tipos declarados antes da leitura: o pyarrow não chega a inferir números (o que
+    # tiraria zeros à esquerda, como em '00078')
+    # (utf-8-sig: com BOM, o nome da primeira coluna não ganha o \ufeff e não escapa do column_types)
+    with open(arquivo_csv, 'r', encoding='utf-8-sig') as f:
+        colunas = next(csv.reader(f), [])
+    try:
+        tabela = pacsv.read_csv(
+            arquivo_csv,
+            convert_options=pacsv.ConvertOptions(
+                column_types={c: pa.string() for c in colunas},
+                null_values=VALORES_NULOS,
+                strings_can_be_null=True
+            )
+        )
+    except pa.ArrowInvalid as e:
+        # Linhas com campos faltando, que o pandas tolera
+        print(f'pyarrow não leu {arquivo_csv} ({e}); usando o pandas')
+        return pd.read_csv(arquivo_csv, dtype=str)
+    return tabela.to_pandas()
 
 def separar_por_estados():
     # Caminho para o arquivo CSV
     arquivo_csv = os.path.join('..', 'medicos-output.csv')
     
-    # Lê o arquivo CSV
-    df = pd.read_csv(arquivo_csv)
+    # Lê o arquivo CSV (tudo como texto: sem inferência de tipos e sem perder zeros à esquerda)
+    df = ler_csv_como_texto(arquivo_csv)
     
     # Converte as colunas para maiúsculas para facilitar a busca
     df['UF'] = df['UF'].str.upper()
@@ -17,14 +53,15 @@ def separar_por_estados():
     if not os.path.exists(pasta_estados):
         os.makedirs(pasta_estados)
     
-    # Obtém a lista única de estados (combinando UF e State A1)
-    estados = pd.concat([df['UF'], df['State A1']]).unique()
-    estados = [estado for estado in estados if pd.notna(estado)]  # Remove valores nulos
+    # Cada médico entra no estado da UF e, se for diferente, também no de State A1
+    por_estado = pd.concat([
+        df.assign(_estado=df['UF']),
+        df[df['State A1'] != df['UF']].assign(_estado=df['State A1']),
+    ]).dropna(subset=['_estado']).sort_index(kind='stable')
     
-    # Para cada estado, cria um arquivo separado
-    for estado in estados:
-        # Filtra os dados pelo estado
-        df_filtrado = df[(df['UF'] == estado) | (df['State A1'] == estado)]
+    # Para cada estado, cria um arquivo separado (um único agrupamento em vez de um filtro por estado)
+    for estado, df_filtrado in por_estado.groupby('_estado', sort=False):
+        df_filtrado = df_filtrado.drop(columns='_estado')
         
         # Cria o nome do arquivo de saída
         arquivo_saida = os.path.join(pasta_estados, f'output_{estado}.csv')
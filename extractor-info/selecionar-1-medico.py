@@ -1,47 +1,230 @@
 import pandas as pd
+import numpy as np
 import os
-import random
+import sys
+import argparse
+import pathlib
 
-def selecionar_um_medico_por_estado():
-    # Caminho para o arquivo CSV
-    arquivo_csv = os.path.join('..', 'medicos-output.csv')
+try:
+    import pyarrow as pa  # Leitura e escrita de CSV em C++ (opcional)
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+try:
+    from numba import njit  # Compila o laço do reservatório (opcional)
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
+
+# CSV de médicos na raiz do repositório, resolvido uma vez (funciona a partir de qualquer diretório)
+ARQUIVO_CSV = os.fspath(pathlib.Path(__file__).resolve().parent.parent / 'medicos-output.csv')
+
+# Acima dessa fração da memória livre, o CSV é lido em blocos em vez de inteiro
+FRACAO_MEMORIA_LEITURA_COMPLETA = 0.25
+LINHAS_POR_BLOCO = 500_000
+
+# Colunas gravadas em um_medico_por_estado.csv (None = todas); com uma lista, só elas
+# (mais UF e State A1) são lidas do CSV
+COLUNAS_SAIDA = None
+DTYPES_ESTADO = {'UF': 'category', 'State A1': 'category'}
+
+# Textos lidos como nulos pelo pyarrow (os mesmos que o read_csv do pandas usa por padrão),
+# para que UF vazia ou 'NA' não vire um estado
+VALORES_NULOS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+                 '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Sobe quando o conteúdo do cache em Parquet muda, para não reaproveitar arquivos antigos
+VERSAO_PARQUET = 2
+
+def colunas_lidas(arquivo_csv):
+    """Colunas a ler do CSV, na ordem do arquivo (None = todas)"""
+    if COLUNAS_SAIDA is None:
+        return None
+    necessarias = set(COLUNAS_SAIDA) | set(DTYPES_ESTADO)
+    return [c for c in pd.read_csv(arquivo_csv, nrows=0).columns if c in necessarias]
+
+def memoria_disponivel():
+    """Memória física livre em bytes (infinita se o sistema não informar)"""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return float('inf')
+
+def estados_em_maiusculas(df):
+    # Converte as colunas para maiúsculas para facilitar a busca; como categoria, só
+    # os poucos valores distintos são convertidos (o map funciona mesmo se 'sp' e 'SP' coexistirem)
+    for coluna in ('UF', 'State A1'):
+        valores = df[coluna].astype('category')
+        categorias = valores.cat.categories
+        df[coluna] = valores.map(dict(zip(categorias, categorias.str.upper())))
+
+def reservatorio_do_bloco(codigos_uf, codigos_a1, aleatorios, totais, posicoes):
+    # Cada médico entra no estado da UF e, se for diferente, também no de State A1
+    # (código -1 = nulo); o n-ésimo médico do estado substitui o escolhido com probabilidade 1/n.
+    # Atualiza totais (acumulado entre blocos) e posicoes (linha escolhida neste bloco, -1 = nenhuma)
+    for i in range(codigos_uf.shape[0]):
+        uf = codigos_uf[i]
+        estado_a1 = codigos_a1[i]
+        if uf >= 0:
+            totais[uf] += 1
+            if aleatorios[2 * i] * totais[uf] < 1:
+                posicoes[uf] = i
+        if estado_a1 >= 0 and estado_a1 != uf:
+            totais[estado_a1] += 1
+            if aleatorios[2 * i + 1] * totais[estado_a1] < 1:
+                posicoes[estado_a1] = i
+
+if NUMBA_DISPONIVEL:
+    reservatorio_do_bloco = njit(cache=True)(reservatorio_do_bloco)
+
+def ler_medicos(arquivo_csv):
+    """Lê o CSV inteiro, com UF e State A1 já em maiúsculas, usando a cópia em Parquet ao lado dele quando ela estiver em dia"""
+    colunas = colunas_lidas(arquivo_csv)
+    if not PYARROW_DISPONIVEL:
+        df = pd.read_csv(arquivo_csv, usecols=colunas, low_memory=False, dtype=DTYPES_ESTADO)
+        estados_em_maiusculas(df)
+        return df
+    
+    # Parquet mais novo que o CSV: dispensa reinterpretar o texto (e lê só as colunas pedidas)
+    arquivo_parquet = os.path.splitext(arquivo_csv)[0] + f'.v{VERSAO_PARQUET}.parquet'
+    if os.path.exists(arquivo_parquet) and os.path.getmtime(arquivo_parquet) >= os.path.getmtime(arquivo_csv):
+        return pd.read_parquet(arquivo_parquet, columns=colunas, engine='pyarrow', dtype_backend='pyarrow')
     
-    # Lê o arquivo CSV
-    df = pd.read_csv(arquivo_csv)
+    # Lê o CSV e converte os estados para maiúsculas dentro do Arrow, sem passar por
+    # objetos Python; o Parquet guarda sempre todas as colunas, para servir a qualquer seleção
+    tabela = pacsv.read_csv(
+        arquivo_csv,
+        convert_options=pacsv.ConvertOptions(
+            column_types={c: pa.string() for c in DTYPES_ESTADO},
+            null_values=VALORES_NULOS,
+            strings_can_be_null=True
+        )
+    )
+    for coluna in DTYPES_ESTADO:
+        tabela = tabela.set_column(tabela.schema.get_field_index(coluna), coluna, pc.utf8_upper(tabela[coluna]))
+    df = tabela.to_pandas(types_mapper=pd.ArrowDtype)
+    try:
+        df.to_parquet(arquivo_parquet, engine='pyarrow', index=False)
+    except Exception as e:
+        print(f'Não foi possível salvar {arquivo_parquet}: {e}')
+    return df if colunas is None else df[colunas]
+
+def sortear_em_memoria(arquivo_csv, rng):
+    """Lê o CSV inteiro e sorteia um médico por estado; retorna (df_final, total de médicos por estado)"""
+    df = ler_medicos(arquivo_csv)
+    
+    # Estados como códigos inteiros (int8) de um mesmo conjunto de categorias para as duas
+    # colunas; valores nulos ficam com código -1
+    uf = df['UF'].astype('category')
+    estado_a1 = df['State A1'].astype('category')
+    estados = np.union1d(uf.cat.categories.to_numpy(dtype=object), estado_a1.cat.categories.to_numpy(dtype=object))
+    codigos_uf = uf.cat.set_categories(estados).cat.codes.to_numpy()
+    codigos_a1 = estado_a1.cat.set_categories(estados).cat.codes.to_numpy()
     
-    # Converte as colunas para maiúsculas para facilitar a busca
-    df['UF'] = df['UF'].str.upper()
-    df['State A1'] = df['State A1'].str.upper()
+    # Visão longa (código, linha): todas as linhas pela UF e, onde State A1 existe e é
+    # diferente, de novo por State A1 (mesma regra de reservatorio_do_bloco)
+    extra = (codigos_a1 >= 0) & (codigos_a1 != codigos_uf)
+    codigos = np.concatenate([codigos_uf, codigos_a1[extra]])
+    linhas = np.concatenate([np.arange(len(df)), np.flatnonzero(extra)])
     
-    # Obtém a lista única de estados (combinando UF e State A1)
-    estados = pd.concat([df['UF'], df['State A1']]).unique()
-    estados = [estado for estado in estados if pd.notna(estado)]  # Remove valores nulos
+    # Agrupamento em formato CSR: ordena as linhas por código uma vez e acha o início de
+    # cada estado com searchsorted (um único vetor de linhas, sem um array por estado).
+    # As UFs nulas (código -1) ficam no começo da ordem e nunca caem em nenhum estado,
+    # então não é preciso filtrá-las antes
+    ordem = np.argsort(codigos, kind='stable')
+    codigos_ordenados, linhas_ordenadas = codigos[ordem], linhas[ordem]
+    inicios = np.searchsorted(codigos_ordenados, np.arange(len(estados)))
+    fins = np.r_[inicios[1:], len(codigos_ordenados)]
     
-    # Lista para armazenar os médicos selecionados
-    medicos_selecionados = []
+    # Só estados com algum médico (equivalente a observed=True): categorias sem linhas
+    # não entram no sorteio nem no resumo
+    observados = fins > inicios
+    estados, inicios, fins = estados[observados], inicios[observados], fins[observados]
     
-    # Para cada estado, seleciona um médico aleatoriamente
-    for estado in estados:
-        # Filtra os dados pelo estado
-        df_estado = df[(df['UF'] == estado) | (df['State A1'] == estado)]
+    # Sorteia um médico de cada estado, todos de uma vez
+    selecionados = linhas_ordenadas[inicios + rng.integers(fins - inicios)]
+    
+    # Monta o resultado com uma única cópia das linhas escolhidas
+    df_final = df.iloc[selecionados].reset_index(drop=True)
+    return df_final, dict(zip(estados, (fins - inicios).tolist()))
+
+def codigos_globais(coluna, indice_estados):
+    """Códigos da coluna categórica no índice global de estados (que cresce com estados novos); nulos = -1"""
+    mapa = [indice_estados.setdefault(estado, len(indice_estados)) for estado in coluna.cat.categories]
+    # O -1 no final faz os nulos (código -1) continuarem -1
+    return np.array(mapa + [-1], dtype=np.int64)[coluna.cat.codes.to_numpy()]
+
+def sortear_em_blocos(arquivo_csv, rng):
+    """Lê o CSV em blocos com amostragem de reservatório (memória proporcional ao número de estados)"""
+    indice_estados = {}  # Estado -> código global
+    totais = np.zeros(0, dtype=np.int64)
+    escolhidos = None  # Linha escolhida de cada estado (índice = código global)
+    
+    leitor = pd.read_csv(arquivo_csv, chunksize=LINHAS_POR_BLOCO, usecols=colunas_lidas(arquivo_csv),
+                         low_memory=False, dtype=DTYPES_ESTADO)
+    for bloco in leitor:
+        estados_em_maiusculas(bloco)
+        codigos_uf = codigos_globais(bloco['UF'].astype('category'), indice_estados)
+        codigos_a1 = codigos_globais(bloco['State A1'].astype('category'), indice_estados)
+        totais = np.concatenate([totais, np.zeros(len(indice_estados) - len(totais), dtype=np.int64)])
+        
+        # Só guarda posições durante o bloco; as linhas são copiadas uma vez no final dele
+        posicoes = np.full(len(indice_estados), -1, dtype=np.int64)
+        reservatorio_do_bloco(codigos_uf, codigos_a1, rng.random(2 * len(bloco)), totais, posicoes)
         
-        if len(df_estado) > 0:
-            # Seleciona um médico aleatoriamente
-            medico_aleatorio = df_estado.sample(n=1)
-            medicos_selecionados.append(medico_aleatorio)
-            print(f'Estado {estado}: Selecionado 1 médico de {len(df_estado)} disponíveis')
+        atualizados = np.flatnonzero(posicoes >= 0)
+        if len(atualizados):
+            novas = bloco.iloc[posicoes[atualizados]].set_axis(atualizados, axis=0)
+            if escolhidos is None:
+                escolhidos = novas
+            else:
+                escolhidos = pd.concat([escolhidos.drop(index=atualizados, errors='ignore'), novas])
     
-    # Combina todos os médicos selecionados em um único DataFrame
-    df_final = pd.concat(medicos_selecionados, ignore_index=True)
+    if escolhidos is None:
+        return pd.DataFrame(), {}
+    # Só estados que apareceram em alguma linha (categorias sem uso ficam com total 0)
+    estados = sorted(estado for estado, codigo in indice_estados.items() if totais[codigo])
+    df_final = escolhidos.loc[[indice_estados[estado] for estado in estados]].reset_index(drop=True)
+    return df_final, {estado: int(totais[indice_estados[estado]]) for estado in estados}
+
+def salvar_csv(df, arquivo_saida):
+    """Salva o DataFrame em CSV"""
+    # Sempre pelo pandas: o escritor do pyarrow põe aspas em todo texto (até no cabeçalho),
+    # e com uma linha por estado não há o que ganhar em velocidade
+    df.to_csv(arquivo_saida, index=False)
+
+def selecionar_um_medico_por_estado(seed=None):
+    arquivo_csv = ARQUIVO_CSV
+    
+    # Um único gerador para todos os sorteios (com seed, o resultado é reproduzível)
+    rng = np.random.default_rng(seed)
+    
+    # Arquivos grandes demais para a memória livre são lidos em blocos
+    if os.path.getsize(arquivo_csv) > memoria_disponivel() * FRACAO_MEMORIA_LEITURA_COMPLETA:
+        print('Arquivo grande: lendo em blocos')
+        df_final, totais = sortear_em_blocos(arquivo_csv, rng)
+    else:
+        df_final, totais = sortear_em_memoria(arquivo_csv, rng)
+    
+    # Resumo por estado numa única escrita
+    sys.stdout.write(''.join(f'Estado {estado}: Selecionado 1 médico de {total} disponíveis\n'
+                             for estado, total in totais.items()))
     
     # Salva o resultado em um novo arquivo CSV
     arquivo_saida = 'um_medico_por_estado.csv'
-    df_final.to_csv(arquivo_saida, index=False)
+    salvar_csv(df_final, arquivo_saida)
     
     print(f'\nArquivo {arquivo_saida} criado com sucesso!')
     print(f'Total de médicos selecionados: {len(df_final)}')
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seleciona aleatoriamente um médico por estado.")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do sorteio, para repetir a mesma seleção.")
+    args = parser.parse_args()
+    
     print('Iniciando seleção aleatória de um médico por estado...')
-    selecionar_um_medico_por_estado()
-    print('\nProcesso concluído!') 
\ No newline at end of file
+    selecionar_um_medico_por_estado(args.seed)
+    print('\nProcesso concluído!')
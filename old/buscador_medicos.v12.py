@@ -15,43 +15,79 @@ Aprimoramentos:
 - Prompts específicos por tipo de campo
 - Limpeza de texto mais agressiva para evitar campos verbosos
 - Validação cruzada de dados entre diferentes fontes
+- Processamento paralelo dos médicos com multiprocessing.Pool
+
+Ollama: como até NUM_PROCESSES médicos são processados ao mesmo tempo, inicie o
+servidor com OLLAMA_NUM_PARALLEL igual ao número de processos e
+OLLAMA_MAX_LOADED_MODELS=1 (ex.: OLLAMA_NUM_PARALLEL=8 OLLAMA_MAX_LOADED_MODELS=1 ollama serve).
 """
 import sys
 import csv
 import re
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
 import logging
 import time
 import os
 import json
 import threading
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import multiprocessing
+import html as html_lib
 from collections import Counter
 import math
 import tempfile
 import shutil
 import traceback
 import hashlib
-import psutil
-from datetime import datetime
+import functools
+import gzip
+import queue
+from datetime import datetime, timezone
 import urllib.parse
 import unicodedata
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # Habilita HTTP/2 no httpx
+    HTTP2_DISPONIVEL = True
+except ImportError:
+    HTTP2_DISPONIVEL = False
+
+# Módulos pesados (selenium, bs4, httpx, pydantic) são importados sob demanda, dentro das
+# funções que os usam, para acelerar a inicialização dos processos do pool
+
 # Configurações
 SEARX_URL   = "http://124.81.6.163:8092/search"
-OLLAMA_URL  = "http://124.81.6.163:11434/api/generate"
+OLLAMA_CHAT_URL = "http://124.81.6.163:11434/api/chat"
+OLLAMA_MODEL = "llama3.1:8b"
+# Requisições simultâneas ao Ollama por médico; o servidor deve ser iniciado
+# com OLLAMA_NUM_PARALLEL >= este valor para atendê-las em paralelo
+OLLAMA_NUM_PARALLEL = 4
 USER_AGENT  = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
     "Chrome/114.0.0.0 Safari/537.36"
 )
 MAX_RESULTS = 15
+# Extensões de arquivos não-HTML que não vale a pena baixar
+_BAD_EXT = frozenset({'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'zip', 'rar'})
+MIN_CANDIDATOS_CAMPO = 3  # Para de baixar URLs quando endereço, telefone e e-mail têm ao menos isso
+TOP_K = 10  # Candidatos mantidos por campo após o ranqueamento
+
+# Processamento paralelo (cada processo mantém um Chrome, então a memória limita o total)
+NUM_PROCESSES = min(8, multiprocessing.cpu_count())
+TAMANHO_CHUNK = 10  # Médicos por tarefa enviada ao pool
+
+# Recursos bloqueados via CDP (não contribuem para a extração de texto)
+BLOCKED_URLS = [
+    '*.css', '*.woff*', '*.ttf', '*.mp4', '*.webm', '*.webp', '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg',
+    '*google-analytics*', '*googletagmanager*', '*facebook.net*', '*doubleclick*'
+]
 
 # Caminhos dos arquivos
 DATA_DIR = 'data'
@@ -62,9 +98,12 @@ EMAIL_BLACKLIST_FILE = os.path.join(DATA_DIR, 'email_blacklist.txt')
 SITE_BLACKLIST_FILE = os.path.join(DATA_DIR, 'site_blacklist.txt')
 LOG_DIR = os.path.join(DATA_DIR, 'logmulti')
 DEBUG_HTML_DIR = os.path.join(DATA_DIR, 'debug_html_v12') # Atualizado para v12
+OLLAMA_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'ollama')
+OLLAMA_CACHE_MAX_FILES = 50000  # Limite de respostas em cache (LRU por arquivo)
+DEBUG_HTML = bool(os.environ.get("DEBUG_HTML"))  # Salva os HTMLs baixados apenas quando definido
 
 # Criar diretórios necessários
-for dir_path in [DATA_DIR, DEBUG_HTML_DIR, LOG_DIR]:
+for dir_path in [DATA_DIR, LOG_DIR, OLLAMA_CACHE_DIR] + ([DEBUG_HTML_DIR] if DEBUG_HTML else []):
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
 
@@ -77,18 +116,26 @@ PATTERNS = {
     'cep':     re.compile(r"\d{5}-\d{3}|\d{8}")
 }
 
+# Limpeza rápida de HTML para extração por regex
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)[^>]*>.*?</\1>', re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_TEL_MAILTO_RE = re.compile(r'(?i:href)=["\']\s*((?:tel|mailto):[^"\']+)["\']')
+
 # Configuração de logging para multiprocessamento
+# Em produção use LOG_LEVEL=WARNING; mensagens de DEBUG nem chegam a ser formatadas
+LOG_LEVEL = getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO)
+
 def setup_logger(process_id):
     logger = logging.getLogger(f"process_{process_id}")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
     
     # Cria um handler para arquivo
     file_handler = logging.FileHandler(os.path.join(LOG_DIR, f'buscador_medicos_v12_p{process_id}.log'), 'w', 'utf-8') # Atualizado para v12
-    file_handler.setLevel(logging.INFO)
+    file_handler.setLevel(LOG_LEVEL)
     
     # Cria um handler para console
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(LOG_LEVEL)
     
     # Define o formato
     formatter = logging.Formatter('%(asctime)s - P%(process)d - %(levelname)s - %(message)s')
@@ -137,13 +184,37 @@ if not SITE_BLACKLIST:
         f.write("google.com\nbing.com\nyahoo.com\nfacebook.com\nlinkedin.com\ninstagram.com\ntwitter.com")
     SITE_BLACKLIST = carregar_lista_arquivo(SITE_BLACKLIST_FILE)
 
+# Termos que indicam resposta de IA ou texto explicativo
+TERMOS_PROIBIDOS = ['não posso', 'não é possível', 'ajudar', 'exemplo']
+
+def compilar_termos_bloqueados(termos):
+    """Compila uma lista de termos em uma única alternação (case-insensitive)"""
+    return re.compile('|'.join(re.escape(t) for t in termos), re.IGNORECASE)
+
+_TERMOS_PROIBIDOS_RE = compilar_termos_bloqueados(TERMOS_PROIBIDOS)
+_EMAIL_BAD_RE = compilar_termos_bloqueados(TERMOS_PROIBIDOS + EMAIL_BLACKLIST)
+_EMAIL_FORMAT_RE = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
+
+# Tabela de remoção de acentos para Latin-1 (mesmo resultado do NFKD + ASCII)
+_ACCENT_MAP = str.maketrans({
+    ch: unicodedata.normalize('NFKD', ch).encode('ASCII', 'ignore').decode('ASCII')
+    for ch in map(chr, range(0xA0, 0x100))
+})
+
+def remover_acentos(texto):
+    """Remove acentos usando a tabela pré-calculada, com fallback para unicodedata"""
+    texto = texto.translate(_ACCENT_MAP)
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII')
+    return texto
+
 def normalizar_endereco(endereco):
     """Normaliza o endereço para busca"""
     if not endereco:
         return ""
     
     # Remove acentos
-    endereco = unicodedata.normalize('NFKD', endereco).encode('ASCII', 'ignore').decode('ASCII')
+    endereco = remover_acentos(endereco)
     
     # Padroniza abreviações
     endereco = re.sub(r'\bR\.\b', 'Rua', endereco, flags=re.IGNORECASE)
@@ -166,7 +237,7 @@ def normalizar_cidade(cidade):
         return ""
     
     # Remove acentos
-    cidade = unicodedata.normalize('NFKD', cidade).encode('ASCII', 'ignore').decode('ASCII')
+    cidade = remover_acentos(cidade)
     
     # Remove caracteres especiais
     cidade = re.sub(r'[^\w\s,-]', '', cidade)
@@ -197,6 +268,9 @@ def formatar_cep(cep):
 
 def criar_driver():
     """Cria uma instância do Chrome WebDriver"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
@@ -211,6 +285,7 @@ def criar_driver():
     options.add_argument('--disable-web-security')
     options.add_argument('--disable-features=IsolateOrigins,site-per-process')
     options.add_argument('--disable-site-isolation-trials')
+    options.add_argument('--blink-settings=imagesEnabled=false')
     options.add_experimental_option('excludeSwitches', ['enable-automation'])
     options.add_experimental_option('useAutomationExtension', False)
     
@@ -226,12 +301,36 @@ def criar_driver():
     options.add_experimental_option('prefs', prefs)
     
     driver = webdriver.Chrome(options=options)
-    
+
+    # Bloqueia CSS, fontes, mídia e rastreadores direto na camada de rede (CDP)
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+    except Exception:
+        pass
+
     # Executa JavaScript para esconder que estamos usando automação
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    
+
     return driver
 
+def resetar_driver(driver):
+    """Apaga cookies e storage do navegador entre médicos, sem fechá-lo"""
+    try:
+        driver.delete_all_cookies()
+        driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+    except Exception:
+        pass
+
+def ler_json_resposta(response):
+    """Decodifica o JSON da resposta com orjson, com fallback para response.json()"""
+    if orjson is not None:
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            pass
+    return response.json()
+
 def buscar_no_searx(query, logger):
     """Busca no SearX e retorna os resultados"""
     try:
@@ -247,7 +346,7 @@ def buscar_no_searx(query, logger):
         
         # Verifica se a resposta foi bem-sucedida
         if response.status_code == 200:
-            data = response.json()
+            data = ler_json_resposta(response)
             results = data.get('results', [])
             
             # Filtra resultados de sites na blacklist
@@ -269,6 +368,8 @@ def buscar_no_searx(query, logger):
 
 def buscar_no_bing(query, driver, logger):
     """Busca no Bing e retorna os resultados"""
+    from selenium.webdriver.common.by import By
+
     try:
         logger.info(f"Buscando no Bing: {query}")
         
@@ -305,6 +406,8 @@ def buscar_no_bing(query, driver, logger):
 
 def buscar_no_google(query, driver, logger):
     """Busca no Google e retorna os resultados"""
+    from selenium.webdriver.common.by import By
+
     try:
         logger.info(f"Buscando no Google: {query}")
         
@@ -339,14 +442,39 @@ def buscar_no_google(query, driver, logger):
         logger.error(f"Erro ao buscar no Google: {e}")
         return []
 
+# Gravação assíncrona dos HTMLs de debug (fila + thread daemon por processo)
+_DEBUG_HTML_QUEUE = None
+
+def _gravar_html_debug():
+    """Consome a fila de HTMLs de debug, gravando cada um comprimido"""
+    while True:
+        debug_file, html = _DEBUG_HTML_QUEUE.get()
+        try:
+            with open(debug_file, 'wb', buffering=65536) as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(html.encode('utf-8', errors='ignore'))
+        except Exception as e:
+            print(f"Erro ao salvar HTML de debug {debug_file}: {e}")
+        finally:
+            _DEBUG_HTML_QUEUE.task_done()
+
+def salvar_html_debug(url, html):
+    """Enfileira o HTML para gravação em DEBUG_HTML_DIR e retorna o caminho do arquivo"""
+    global _DEBUG_HTML_QUEUE
+    if _DEBUG_HTML_QUEUE is None:
+        _DEBUG_HTML_QUEUE = queue.Queue()
+        threading.Thread(target=_gravar_html_debug, daemon=True).start()
+    
+    # Gera um hash da URL para identificação única
+    url_hash = hashlib.md5(url.encode()).hexdigest()
+    debug_file = os.path.join(DEBUG_HTML_DIR, f"{url_hash}.html.gz")
+    _DEBUG_HTML_QUEUE.put((debug_file, html))
+    return debug_file
+
 def baixar_html(url, driver, logger):
     """Baixa o HTML de uma URL"""
     try:
         logger.info(f"Baixando HTML de {url}")
         
-        # Gera um hash da URL para identificação única
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        
         # Acessa a URL
         driver.get(url)
         time.sleep(2)
@@ -355,15 +483,14 @@ def baixar_html(url, driver, logger):
         html = driver.page_source
         
         # Limita o tamanho do HTML para evitar problemas de memória
-        if len(html) > 3 * 1024 * 1024:
+        if len(html) > MAX_HTML_BYTES:
             logger.warning(f"HTML muito grande ({len(html) / 1024 / 1024:.2f} MB), truncando...")
-            html = html[:3 * 1024 * 1024]
+            html = html[:MAX_HTML_BYTES]
         
-        # Salva o HTML para debug
-        debug_file = os.path.join(DEBUG_HTML_DIR, f"{url_hash}.html")
-        with open(debug_file, 'w', encoding='utf-8', errors='ignore') as f:
-            f.write(html)
-        logger.info(f"HTML salvo para debug: {debug_file}")
+        # Salva o HTML para debug (em segundo plano, apenas com DEBUG_HTML=1)
+        if DEBUG_HTML:
+            debug_file = salvar_html_debug(url, html)
+            logger.info(f"HTML enfileirado para debug: {debug_file}")
         
         return html
     
@@ -371,6 +498,44 @@ def baixar_html(url, driver, logger):
         logger.error(f"Erro ao baixar HTML de {url}: {e}")
         return None
 
+# Páginas que só exibem conteúdo com JavaScript
+_RE_PRECISA_JS = re.compile(
+    r'<noscript>[^<]*(?:enable|habilite|ative)\s+(?:o\s+)?javascript|<meta[^>]+http-equiv=["\']?refresh',
+    re.IGNORECASE
+)
+MAX_HTML_BYTES = 3 * 1024 * 1024
+
+def precisa_renderizar(html):
+    """Indica se o HTML obtido sem navegador precisa ser renderizado pelo Selenium"""
+    return not html or len(html) < 1024 or bool(_RE_PRECISA_JS.search(html))
+
+async def _baixar_htmls_async(urls, logger):
+    import httpx
+    limits = httpx.Limits(max_keepalive_connections=40, max_connections=100)
+    headers = {'User-Agent': USER_AGENT}
+    async with httpx.AsyncClient(http2=HTTP2_DISPONIVEL, limits=limits, timeout=15,
+                                 headers=headers, follow_redirects=True) as client:
+        respostas = await asyncio.gather(*(client.get(url) for url in urls), return_exceptions=True)
+    
+    htmls = {}
+    for url, response in zip(urls, respostas):
+        if isinstance(response, Exception):
+            logger.warning(f"Erro ao baixar HTML de {url} via httpx: {response}")
+            continue
+        if response.status_code != 200 or 'html' not in response.headers.get('content-type', 'text/html'):
+            continue
+        html = response.text[:MAX_HTML_BYTES]
+        if DEBUG_HTML:
+            salvar_html_debug(url, html)
+        htmls[url] = html
+    return htmls
+
+def baixar_htmls(urls, logger):
+    """Baixa várias URLs ao mesmo tempo sem navegador ({url: html}, só as que responderam)"""
+    if not urls:
+        return {}
+    return asyncio.run(_baixar_htmls_async(urls, logger))
+
 def limpar_endereco(endereco):
     """Limpa o endereço removendo textos indesejados"""
     if not endereco:
@@ -423,7 +588,7 @@ def validar_telefone(telefone):
         return False
     
     # Verifica se não é uma resposta de IA ou texto explicativo
-    if any(termo in telefone.lower() for termo in ['não posso', 'não é possível', 'ajudar', 'exemplo']):
+    if _TERMOS_PROIBIDOS_RE.search(telefone):
         return False
     
     # Remove caracteres não numéricos
@@ -449,16 +614,12 @@ def validar_email(email):
     if not email:
         return False
     
-    # Verifica se está na blacklist
-    if any(domain in email.lower() for domain in EMAIL_BLACKLIST):
-        return False
-    
     # Verifica se tem formato básico de email
-    if not re.match(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$', email):
+    if not _EMAIL_FORMAT_RE.match(email):
         return False
     
-    # Verifica se não é uma resposta de IA ou texto explicativo
-    if any(termo in email.lower() for termo in ['não posso', 'não é possível', 'ajudar', 'exemplo']):
+    # Verifica blacklist e respostas de IA/texto explicativo em uma única busca
+    if _EMAIL_BAD_RE.search(email):
         return False
     
     return True
@@ -475,16 +636,10 @@ def extrair_candidatos(html, logger):
         }
     
     try:
-        # Parseia o HTML
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Remove scripts e estilos
-        for script in soup(['script', 'style']):
-            script.decompose()
-        
-        # Obtém o texto
-        text = soup.get_text(' ')
-        
+        # Remove scripts, estilos e tags direto no HTML (sem montar a árvore)
+        text = _TAG_RE.sub(' ', _SCRIPT_STYLE_RE.sub('', html))
+        text = html_lib.unescape(text)
+
         # Extrai candidatos usando regex
         candidates = {
             'address': PATTERNS['address'].findall(text),
@@ -495,8 +650,7 @@ def extrair_candidatos(html, logger):
         }
         
         # Extrai links de telefone e email
-        for a in soup.find_all('a', href=True):
-            href = a['href']
+        for href in _TEL_MAILTO_RE.findall(html):
             if href.startswith('tel:'):
                 phone = href[4:].strip()
                 candidates['phone'].append(phone)
@@ -535,7 +689,8 @@ def aggregate_and_rank(all_c, logger):
     """Agrega e ranqueia os candidatos"""
     ranked = {}
     for k,lst in all_c.items():
-        ranked[k] = [item for item,_ in Counter(lst).most_common()]
+        # most_common(n) usa heapq.nlargest: O(U log K) em vez de ordenar tudo
+        ranked[k] = [item for item,_ in Counter(lst).most_common(TOP_K)]
         logger.info(f"Ranked {k}: {len(ranked[k])} items")
     return ranked
 
@@ -557,6 +712,8 @@ def descobrir_cidade(endereco, uf, driver, logger):
     if not endereco:
         return ""
     
+    from bs4 import BeautifulSoup
+    
     try:
         # Busca no Google
         query = f"{endereco} cidade {uf}"
@@ -642,7 +799,7 @@ def find_cep_searxng(address, number, bairro, city, state, logger):
         logger.info(f"[SearXNG] Buscando CEP para: {query}")
         response = requests.get(SEARX_URL, params=params, headers=headers, timeout=30)
         response.raise_for_status()
-        results = response.json()
+        results = ler_json_resposta(response)
 
         for item in results.get('results', []):
             text_to_search = item.get('title', '') + " " + item.get('content', '') + " " + item.get('snippet', '') + " " + item.get('description', '')
@@ -669,6 +826,8 @@ def find_cep_searxng(address, number, bairro, city, state, logger):
 
 def find_cep_google_selenium(driver, address, number, bairro, city, state, logger):
     """Tenta encontrar o CEP usando Selenium e busca no Google."""
+    from selenium.webdriver.common.by import By
+
     if not driver or not all([address, city, state]):
         return None
 
@@ -697,6 +856,11 @@ def find_cep_google_selenium(driver, address, number, bairro, city, state, logge
 
 def find_cep_correios_selenium(driver, address, number, bairro, city, state_uf, logger):
     """Tenta encontrar o CEP usando Selenium no site dos Correios."""
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    
     if not driver or not address: # Cidade e Estado são cruciais para Correios
         return None
 
@@ -859,30 +1023,23 @@ EXEMPLOS_CAMPOS = {
     ]
 }
 
-def gerar_prompt_ollama(texto, tipo_campo, exemplos, logger):
-    """Gera um prompt para o Ollama com exemplos específicos"""
-    # Exemplos específicos para o tipo de campo
-    exemplos_campo = EXEMPLOS_CAMPOS.get(tipo_campo, [])
-    
-    # Adiciona exemplos específicos ao prompt
-    exemplos_texto = "\n".join([f"- {ex}" for ex in exemplos_campo])
-    
-    # Instruções específicas por tipo de campo
-    instrucoes_especificas = {
-        'address': "Extraia apenas o nome da rua/avenida, sem número, complemento, bairro, cidade ou estado.",
-        'phone': "Extraia apenas o número de telefone no formato (XX) XXXX-XXXX ou (XX) XXXXX-XXXX.",
-        'email': "Extraia apenas o endereço de e-mail completo, em minúsculas.",
-        'complement': "Extraia apenas o complemento do endereço (sala, bloco, apartamento, etc.).",
-        'city': "Extraia apenas o nome da cidade, sem estado ou país.",
-        'state': "Extraia apenas a sigla do estado (2 letras maiúsculas).",
-        'bairro': "Extraia apenas o nome do bairro, sem cidade ou estado.",
-        'cep': "Extraia apenas o CEP no formato XXXXX-XXX."
-    }
-    
-    instrucao = instrucoes_especificas.get(tipo_campo, "Extraia a informação solicitada.")
-    
-    # Regras para garantir respostas limpas
-    regras = """
+# Instruções específicas por tipo de campo
+INSTRUCOES_CAMPOS = {
+    'address': "Extraia apenas o nome da rua/avenida, sem número, complemento, bairro, cidade ou estado.",
+    'phone': "Extraia apenas o número de telefone no formato (XX) XXXX-XXXX ou (XX) XXXXX-XXXX.",
+    'email': "Extraia apenas o endereço de e-mail completo, em minúsculas.",
+    'complement': "Extraia apenas o complemento do endereço (sala, bloco, apartamento, etc.).",
+    'city': "Extraia apenas o nome da cidade, sem estado ou país.",
+    'state': "Extraia apenas a sigla do estado (2 letras maiúsculas).",
+    'bairro': "Extraia apenas o nome do bairro, sem cidade ou estado.",
+    'cep': "Extraia apenas o CEP no formato XXXXX-XXX."
+}
+
+# Exemplos já formatados como lista, por tipo de campo
+_EXEMPLOS_TEXTO = {k: "\n".join(f"- {ex}" for ex in v) for k, v in EXEMPLOS_CAMPOS.items()}
+
+# Regras para garantir respostas limpas
+REGRAS_PROMPT = """
     REGRAS IMPORTANTES:
     1. Responda APENAS com a informação solicitada, sem explicações ou texto adicional.
     2. Se não encontrar a informação, responda apenas com uma string vazia.
@@ -895,44 +1052,158 @@ def gerar_prompt_ollama(texto, tipo_campo, exemplos, logger):
     9. Não inclua texto explicativo antes ou depois da informação.
     10. Forneça apenas UMA resposta, a mais provável e relevante.
     """
+
+def gerar_prompt_sistema(tipo_campo):
+    """Gera o prompt de sistema (instruções, exemplos e regras) de um tipo de campo
     
-    # Constrói o prompt completo
-    prompt = f"""
-    Analise o seguinte texto e extraia apenas a informação de {tipo_campo}:
+    O texto é fixo por tipo de campo, para que o Ollama reaproveite o KV-cache do
+    prefixo entre chamadas; apenas a mensagem do usuário varia.
+    """
+    exemplos_texto = _EXEMPLOS_TEXTO.get(tipo_campo, '')
+    instrucao = INSTRUCOES_CAMPOS.get(tipo_campo, "Extraia a informação solicitada.")
     
-    {texto}
+    return f"""
+    Analise o texto enviado pelo usuário e extraia apenas a informação de {tipo_campo}.
     
     {instrucao}
     
     Exemplos do formato esperado:
     {exemplos_texto}
     
-    {regras}
+    {REGRAS_PROMPT}
     """
-    
-    logger.info(f"Prompt gerado para {tipo_campo} com {len(exemplos_campo)} exemplos")
-    return prompt
 
-def consultar_ollama(prompt, logger):
+# Prompts de sistema pré-calculados (byte a byte idênticos entre chamadas)
+PROMPTS_SISTEMA = {tipo: gerar_prompt_sistema(tipo) for tipo in INSTRUCOES_CAMPOS}
+
+def gerar_prompt_ollama(texto, tipo_campo, exemplos, logger):
+    """Gera a parte variável do prompt (mensagem do usuário) para o Ollama"""
+    logger.debug("Prompt gerado para %s com %d exemplos", tipo_campo, len(EXEMPLOS_CAMPOS.get(tipo_campo, [])))
+    return texto
+
+class OllamaCache:
+    """Cache em disco das respostas do Ollama, endereçado pelo conteúdo (modelo + prompt)"""
+    
+    def __init__(self, cache_dir, max_files=OLLAMA_CACHE_MAX_FILES):
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self._num_files = None
+    
+    @staticmethod
+    def chave(*partes):
+        """sha256 dos componentes (modelo, opções, prompt) com prefixo de tamanho de 8 bytes"""
+        h = hashlib.sha256()
+        for parte in partes:
+            parte = parte.encode('utf-8')
+            h.update(len(parte).to_bytes(8, 'big'))
+            h.update(parte)
+        return h.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def get(self, key):
+        """Retorna a resposta em cache ou None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # Marca como usado recentemente (LRU)
+            return entry['response']
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def set(self, key, response_text):
+        """Grava a resposta de forma atômica e aplica o limite de arquivos"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'model': OLLAMA_MODEL,
+                    'response': response_text,
+                    'created_at': datetime.now(timezone.utc).isoformat()
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Erro ao salvar cache do Ollama: {e}")
+            return
+        
+        if self._num_files is None:
+            self._num_files = len(os.listdir(self.cache_dir))
+        self._num_files += 1
+        if self._num_files > self.max_files:
+            self._evict()
+    
+    def _evict(self):
+        """Remove os 10% de entradas menos usadas recentemente"""
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.json')]
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:max(1, len(entries) // 10)]:
+                os.remove(entry.path)
+            self._num_files = len(os.listdir(self.cache_dir))
+        except OSError as e:
+            print(f"Erro ao limpar cache do Ollama: {e}")
+
+OLLAMA_CACHE = OllamaCache(OLLAMA_CACHE_DIR)
+
+# Sessão HTTP persistente (keep-alive) para as consultas ao Ollama
+_OLLAMA_SESSION = requests.Session()
+_OLLAMA_SESSION.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0))
+_OLLAMA_SESSION.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip, deflate'})
+
+# Limite de tokens gerados por tipo de campo (as respostas são curtas)
+_NUM_PREDICT = {
+    'address': 64,
+    'complement': 24,
+    'city': 16,
+    'bairro': 16,
+    'state': 4,
+    'cep': 12,
+    'phone': 16,
+    'email': 32
+}
+
+def montar_dados_ollama(prompt, tipo_campo=None):
+    """Monta o corpo da requisição ao /api/chat com geração curta e determinística"""
+    sistema = PROMPTS_SISTEMA.get(tipo_campo) or gerar_prompt_sistema(tipo_campo)
+    return {
+        "model": OLLAMA_MODEL,
+        "messages": [
+            {"role": "system", "content": sistema},
+            {"role": "user", "content": prompt}
+        ],
+        "stream": False,
+        "options": {
+            "num_predict": _NUM_PREDICT.get(tipo_campo, 32),
+            "temperature": 0,
+            "top_k": 1,
+            "stop": ["\n\n"]
+        }
+    }
+
+def consultar_ollama(prompt, logger, tipo_campo=None):
     """Consulta o modelo Ollama"""
     try:
-        logger.info("Consultando Ollama...")
+        data = montar_dados_ollama(prompt, tipo_campo)
+        cache_key = OLLAMA_CACHE.chave(OLLAMA_MODEL, json.dumps(data['options'], sort_keys=True), data['messages'][0]['content'], prompt)
+        cached = OLLAMA_CACHE.get(cache_key)
+        if cached is not None:
+            logger.debug("Resposta do Ollama (cache): %s", cached)
+            return cached
         
-        # Prepara os dados
-        data = {
-            "model": "llama3.1:8b",
-            "prompt": prompt,
-            "stream": False
-        }
+        logger.debug("Consultando Ollama...")
         
         # Faz a requisição
-        response = requests.post(OLLAMA_URL, json=data, timeout=30)
+        response = _OLLAMA_SESSION.post(OLLAMA_CHAT_URL, json=data, timeout=30)
         
         # Verifica se a resposta foi bem-sucedida
         if response.status_code == 200:
             result = response.json()
-            response_text = result.get('response', '').strip()
-            logger.info(f"Resposta do Ollama: {response_text}")
+            response_text = result.get('message', {}).get('content', '').strip()
+            logger.debug("Resposta do Ollama: %s", response_text)
+            OLLAMA_CACHE.set(cache_key, response_text)
             return response_text
         
         logger.warning(f"Ollama retornou status {response.status_code}")
@@ -942,31 +1213,174 @@ def consultar_ollama(prompt, logger):
         logger.error(f"Erro ao consultar Ollama: {e}")
         return ""
 
+async def consultar_ollama_async(prompt, client, logger, tipo_campo=None):
+    """Consulta o modelo Ollama de forma assíncrona"""
+    try:
+        data = montar_dados_ollama(prompt, tipo_campo)
+        cache_key = OLLAMA_CACHE.chave(OLLAMA_MODEL, json.dumps(data['options'], sort_keys=True), data['messages'][0]['content'], prompt)
+        cached = OLLAMA_CACHE.get(cache_key)
+        if cached is not None:
+            logger.debug("Resposta do Ollama (cache): %s", cached)
+            return cached
+        
+        logger.debug("Consultando Ollama (async)...")
+        
+        response = await client.post(OLLAMA_CHAT_URL, json=data)
+        
+        if response.status_code == 200:
+            response_text = response.json().get('message', {}).get('content', '').strip()
+            logger.debug("Resposta do Ollama: %s", response_text)
+            OLLAMA_CACHE.set(cache_key, response_text)
+            return response_text
+        
+        logger.warning(f"Ollama retornou status {response.status_code}")
+        return ""
+    
+    except Exception as e:
+        logger.error(f"Erro ao consultar Ollama: {e}")
+        return ""
+
+async def _consultar_ollama_lote(prompts, logger):
+    import httpx
+    limits = httpx.Limits(max_keepalive_connections=OLLAMA_NUM_PARALLEL, max_connections=OLLAMA_NUM_PARALLEL)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        respostas = await asyncio.gather(
+            *(consultar_ollama_async(prompt, client, logger, tipo) for tipo, prompt in prompts.items())
+        )
+    return dict(zip(prompts, respostas))
+
+def consultar_ollama_lote(prompts, logger):
+    """Consulta o Ollama com vários prompts ao mesmo tempo ({tipo_campo: prompt} -> {tipo_campo: resposta})"""
+    if not prompts:
+        return {}
+    return asyncio.run(_consultar_ollama_lote(prompts, logger))
+
+# Campos extraídos pelo Ollama em uma única chamada com saída JSON
+CAMPOS_ESTRUTURADOS = ('address', 'complement', 'city', 'bairro')
+
+@functools.lru_cache(maxsize=None)
+def modelo_campos_medico():
+    """Modelo pydantic dos campos estruturados (todos str, vazio por padrão), criado no primeiro uso"""
+    from pydantic import create_model
+    return create_model('CamposMedico', **{campo: (str, "") for campo in CAMPOS_ESTRUTURADOS})
+
+# Prompt de sistema fixo da chamada estruturada (preserva o KV-cache do prefixo)
+PROMPT_SISTEMA_ESTRUTURADO = f"""
+    Analise os textos enviados pelo usuário, encontrados no site de um médico.
+    
+    Responda APENAS com um objeto JSON com as chaves {", ".join(CAMPOS_ESTRUTURADOS)}.
+    Use string vazia para o que não for possível extrair.
+    {chr(10).join(f"- {campo}: {INSTRUCOES_CAMPOS[campo]}" for campo in CAMPOS_ESTRUTURADOS)}
+    """
+
+def gerar_prompt_estruturado(candidatos, erro=None):
+    """Gera a mensagem do usuário com os textos candidatos de cada campo"""
+    prompt = "\n".join(f"- {tipo}: {texto}" for tipo, texto in candidatos.items())
+    if erro:
+        prompt += f"\n\nA resposta anterior era inválida ({erro}). Corrija e responda apenas com o JSON."
+    return prompt
+
+def validar_campos_ollama(candidatos, logger, max_tentativas=3):
+    """Extrai address/complement/city/bairro em uma única chamada ao Ollama (format=json)
+    
+    Em caso de JSON inválido, repete a chamada informando o erro (até 2 novas tentativas).
+    Retorna um dict com os campos ou None se todas as tentativas falharem.
+    """
+    from pydantic import ValidationError
+    
+    erro = None
+    for tentativa in range(max_tentativas):
+        prompt = gerar_prompt_estruturado(candidatos, erro)
+        cache_key = OLLAMA_CACHE.chave(OLLAMA_MODEL, 'json', PROMPT_SISTEMA_ESTRUTURADO, prompt)
+        resposta = OLLAMA_CACHE.get(cache_key)
+        
+        try:
+            if resposta is None:
+                logger.debug("Consultando Ollama (JSON, tentativa %d)...", tentativa + 1)
+                data = {
+                    "model": OLLAMA_MODEL,
+                    "messages": [
+                        {"role": "system", "content": PROMPT_SISTEMA_ESTRUTURADO},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "format": "json",
+                    "stream": False,
+                    "options": {"temperature": 0}
+                }
+                response = _OLLAMA_SESSION.post(OLLAMA_CHAT_URL, json=data, timeout=30)
+                if response.status_code != 200:
+                    logger.warning(f"Ollama retornou status {response.status_code}")
+                    return None
+                resposta = response.json().get('message', {}).get('content', '')
+            
+            campos = modelo_campos_medico().model_validate_json(resposta)
+            OLLAMA_CACHE.set(cache_key, resposta)
+            logger.debug("Resposta do Ollama (JSON): %s", campos)
+            return campos.model_dump()
+        
+        except ValidationError as e:
+            erro = str(e.errors()[0].get('msg', e)) if e.errors() else str(e)
+            logger.warning(f"JSON inválido do Ollama: {erro}")
+        except Exception as e:
+            logger.error(f"Erro ao consultar Ollama: {e}")
+            return None
+    
+    return None
+
+# Textos explicativos comuns no início das respostas do Ollama
+EXPLICATIVOS = [
+    "Aqui está", "Aqui estão", "Encontrei", "Segue", "Baseado em",
+    "De acordo com", "Conforme", "Segundo", "A seguir", "Abaixo",
+    "Informações", "Dados", "Detalhes", "Resultados", "Análise",
+    "Observação", "Nota", "Importante", "Atenção", "Aviso",
+    "Não foi possível", "Não encontrei", "Não há", "Não existe",
+    "Não disponível", "Não informado", "Não consta", "Não identificado"
+]
+
+# Remove tudo que não é dígito, inclusive separadores Unicode como o \xa0 do &nbsp;
+_RE_NONDIGIT = re.compile(r'\D')
+
+# Padrões usados em limpar_texto_extenso (compilados uma única vez)
+_EXPL_TUPLE = tuple(EXPLICATIVOS)
+_RE_EXPLICATIVOS = re.compile(
+    r'^(?:' + '|'.join(re.escape(e) for e in sorted(EXPLICATIVOS, key=len, reverse=True)) + r')[:\s,.;\-]*'
+)
+# Marcadores raros são removidos com str.translate; a regex cobre só os comuns
+_BULLET_TRANS = str.maketrans('', '', '◦‣⁃⁌⁍⦾⦿⁕⁘⁙⁚⁛⁜⁝⁞')
+_RE_LEADING_BULLET = re.compile(r'^\s*[\*\-•·]\s*')
+_RE_NUM_BULLET = re.compile(r'^\s*\d+[\.\)]\s*')
+_RE_CEP_ROTULO = re.compile(r'CEP:?\s*\d{5}-?\d{3}')
+_RE_SUFIXO_UF = re.compile(r'\s+-\s+[A-Z]{2}$')
+_RE_SUFIXO_CIDADE = re.compile(r'\s+-\s+.*$')
+_RE_PHONE_PAREN = re.compile(r'\(\d{2}\)\s?\d{4,5}-\d{4}')
+_RE_PHONE_BARE = re.compile(r'\d{2}\s?\d{4,5}-\d{4}')
+_RE_EMAIL = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+_RE_STATE = re.compile(r'\b[A-Z]{2}\b')
+_RE_ESPACOS = re.compile(r'\s+')
+_RE_PREFIXO_CAMPO = {
+    'address': re.compile(r'^(Endereço|Localização|Local|Sede|Consultório):\s*'),
+    'complement': re.compile(r'^(Complemento|Informações adicionais|Adicional|Obs):\s*'),
+    'city': re.compile(r'^(Cidade|Município|Localidade):\s*'),
+    'bairro': re.compile(r'^(Bairro|Região|Distrito|Setor):\s*'),
+}
+
 def limpar_texto_extenso(texto, tipo_campo, logger):
     """Limpa texto extenso removendo informações irrelevantes"""
     if not texto:
         return ""
     
-    logger.info(f"Limpando texto extenso para campo {tipo_campo}: {texto[:50]}...")
-    
-    # Remove textos explicativos comuns
-    explicativos = [
-        "Aqui está", "Aqui estão", "Encontrei", "Segue", "Baseado em", 
-        "De acordo com", "Conforme", "Segundo", "A seguir", "Abaixo",
-        "Informações", "Dados", "Detalhes", "Resultados", "Análise",
-        "Observação", "Nota", "Importante", "Atenção", "Aviso",
-        "Não foi possível", "Não encontrei", "Não há", "Não existe",
-        "Não disponível", "Não informado", "Não consta", "Não identificado"
-    ]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Limpando texto extenso para campo %s: %s...", tipo_campo, texto[:50])
     
-    for exp in explicativos:
-        if texto.startswith(exp):
-            # Remove o texto explicativo e qualquer pontuação ou espaço após ele
-            texto = re.sub(f"^{exp}[:\s,.;-]*", "", texto)
+    # Remove o texto explicativo inicial e qualquer pontuação ou espaço após ele
+    # (startswith com tupla evita rodar a regex no caso comum, sem prefixo)
+    if texto.startswith(_EXPL_TUPLE):
+        texto = _RE_EXPLICATIVOS.sub('', texto, count=1)
     
     # Remove marcadores de lista e numeração
-    texto = re.sub(r'^\s*[\*\-•◦‣⁃⁌⁍⦾⦿⁕⁘⁙⁚⁛⁜⁝⁞⁂⁃⁄⁅⁆⁇⁈⁉⁊⁋⁌⁍⁎⁏⁐⁑⁒⁓⁔⁕⁖⁗⁘⁙⁚⁛⁜⁝⁞⁰ⁱ⁲⁳⁴⁵⁶⁷⁸⁹⁺⁻⁼⁽⁾ⁿ₀₁₂₃₄₅₆₇₈₉₊₋₌₍₎ₐₑₒₓₔₕₖₗₘₙₚₛₜ]\s*', '', texto)
-    texto = re.sub(r'^\s*\d+[\.\)]\s*', '', texto)
+    texto = texto.translate(_BULLET_TRANS)
+    texto = _RE_LEADING_BULLET.sub('', texto)
+    texto = _RE_NUM_BULLET.sub('', texto)
     
     # Remove aspas e parênteses
     texto = texto.strip('"\'()[]{}')
@@ -974,22 +1388,22 @@ def limpar_texto_extenso(texto, tipo_campo, logger):
     # Tratamento específico por tipo de campo
     if tipo_campo == 'address':
         # Remove informações de CEP
-        texto = re.sub(r'CEP:?\s*\d{5}-?\d{3}', '', texto)
+        texto = _RE_CEP_ROTULO.sub('', texto)
         # Remove informações de cidade/estado
-        texto = re.sub(r'\s+-\s+[A-Z]{2}$', '', texto)
+        texto = _RE_SUFIXO_UF.sub('', texto)
         # Remove textos como "Endereço:" ou "Localização:"
-        texto = re.sub(r'^(Endereço|Localização|Local|Sede|Consultório):\s*', '', texto)
+        texto = _RE_PREFIXO_CAMPO['address'].sub('', texto)
         # Limita o tamanho do endereço
         texto = texto[:100]
     
     elif tipo_campo == 'phone':
         # Extrai apenas o número de telefone no formato (XX) XXXX-XXXX ou (XX) XXXXX-XXXX
-        match = re.search(r'\(\d{2}\)\s?\d{4,5}-\d{4}', texto)
+        match = _RE_PHONE_PAREN.search(texto)
         if match:
             texto = match.group(0)
         else:
             # Tenta extrair números com DDD sem parênteses
-            match = re.search(r'\d{2}\s?\d{4,5}-\d{4}', texto)
+            match = _RE_PHONE_BARE.search(texto)
             if match:
                 num = match.group(0)
                 ddd = num[:2]
@@ -998,7 +1412,7 @@ def limpar_texto_extenso(texto, tipo_campo, logger):
     
     elif tipo_campo == 'email':
         # Extrai apenas o email
-        match = re.search(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', texto)
+        match = _RE_EMAIL.search(texto)
         if match:
             texto = match.group(0)
         # Converte para minúsculas
@@ -1008,19 +1422,19 @@ def limpar_texto_extenso(texto, tipo_campo, logger):
         # Limita o complemento a 30 caracteres
         texto = texto[:30]
         # Remove textos como "Complemento:" ou "Informações adicionais:"
-        texto = re.sub(r'^(Complemento|Informações adicionais|Adicional|Obs):\s*', '', texto)
+        texto = _RE_PREFIXO_CAMPO['complement'].sub('', texto)
     
     elif tipo_campo == 'city':
         # Remove textos como "Cidade:" ou "Município:"
-        texto = re.sub(r'^(Cidade|Município|Localidade):\s*', '', texto)
+        texto = _RE_PREFIXO_CAMPO['city'].sub('', texto)
         # Remove qualquer texto após o nome da cidade (como estado ou país)
-        texto = re.sub(r'\s+-\s+.*$', '', texto)
+        texto = _RE_SUFIXO_CIDADE.sub('', texto)
         # Limita o tamanho da cidade
         texto = texto[:30]
     
     elif tipo_campo == 'state':
         # Extrai apenas a sigla do estado (2 letras maiúsculas)
-        match = re.search(r'\b[A-Z]{2}\b', texto)
+        match = _RE_STATE.search(texto)
         if match:
             texto = match.group(0)
         # Limita a 2 caracteres
@@ -1028,18 +1442,18 @@ def limpar_texto_extenso(texto, tipo_campo, logger):
     
     elif tipo_campo == 'bairro':
         # Remove textos como "Bairro:" ou "Região:"
-        texto = re.sub(r'^(Bairro|Região|Distrito|Setor):\s*', '', texto)
+        texto = _RE_PREFIXO_CAMPO['bairro'].sub('', texto)
         # Limita o tamanho do bairro
         texto = texto[:30]
     
     # Remove múltiplos espaços
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    texto = _RE_ESPACOS.sub(' ', texto).strip()
     
-    logger.info(f"Texto limpo: {texto}")
+    logger.debug("Texto limpo: %s", texto)
     return texto
 
-def processar_medico(medico, process_id, lock, logger):
-    """Processa um médico para extrair informações"""
+def processar_medico(medico, process_id, logger, driver):
+    """Processa um médico para extrair informações (o driver é compartilhado pelo chunk)"""
     try:
         # Extrai os campos do médico
         crm = medico.get('CRM', '')
@@ -1049,9 +1463,6 @@ def processar_medico(medico, process_id, lock, logger):
         
         logger.info(f"Processando médico: {firstname} {lastname} (CRM: {crm}, UF: {uf})")
         
-        # Cria um driver para este processo
-        driver = criar_driver()
-        
         try:
             # Constrói a query de busca
             query = f"{firstname} {lastname} médico {uf} CRM {crm}"
@@ -1069,34 +1480,35 @@ def processar_medico(medico, process_id, lock, logger):
             # Combina os resultados
             all_results = searx_results + bing_results + google_results
             
-            # Filtra URLs duplicadas
-            unique_urls = []
-            seen_urls = set()
-            for result in all_results:
-                url = result.get('url', '')
-                if url and url not in seen_urls:
-                    seen_urls.add(url)
-                    unique_urls.append(url)
-            
-            logger.info(f"URLs únicas encontradas: {len(unique_urls)}")
-            
-            # Prioriza URLs que contêm o nome do médico
+            # Filtra URLs duplicadas e prioriza as que contêm o nome do médico (uma passada)
             nome_lower = f"{firstname} {lastname}".lower()
+            seen_urls = set()
             prioritized_urls = []
             other_urls = []
+            for result in all_results:
+                url = result.get('url', '')
+                if not url or url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                (prioritized_urls if nome_lower in url.lower() else other_urls).append(url)
             
-            for url in unique_urls:
-                if nome_lower in url.lower():
-                    prioritized_urls.append(url)
-                else:
-                    other_urls.append(url)
+            logger.info(f"URLs únicas encontradas: {len(seen_urls)}")
             
             # Combina as listas, com as URLs prioritárias primeiro
             final_urls = prioritized_urls + other_urls
             logger.info(f"URLs prioritárias: {len(prioritized_urls)}")
             
             # Limita o número de URLs para processamento
-            urls_to_process = final_urls[:MAX_RESULTS]
+            urls_to_process = []
+            for url in final_urls[:MAX_RESULTS]:
+                # Verifica se é um arquivo não-HTML
+                if urllib.parse.urlparse(url).path.lower().rpartition('.')[2] in _BAD_EXT:
+                    logger.info(f"Pulando arquivo não-HTML: {url}")
+                    continue
+                urls_to_process.append(url)
+            
+            # Baixa todas as páginas em paralelo sem navegador; o Selenium fica para as que exigem JavaScript
+            htmls = baixar_htmls(urls_to_process, logger)
             
             # Inicializa os candidatos
             all_candidates = {
@@ -1107,18 +1519,18 @@ def processar_medico(medico, process_id, lock, logger):
                 'cep': []
             }
             
+            # Domínios em que cada endereço (normalizado) apareceu, para detectar consenso
+            dominios_endereco = {}
+            
             # Processa cada URL
             for url in urls_to_process:
                 try:
                     logger.info(f"Processando URL: {url}")
                     
-                    # Verifica se é um arquivo não-HTML
-                    if any(ext in url.lower() for ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip', '.rar']):
-                        logger.info(f"Pulando arquivo não-HTML: {url}")
-                        continue
-                    
-                    # Baixa o HTML
-                    html = baixar_html(url, driver, logger)
+                    # Usa o HTML já baixado ou renderiza a página com o Selenium
+                    html = htmls.get(url)
+                    if precisa_renderizar(html):
+                        html = baixar_html(url, driver, logger)
                     if not html:
                         logger.warning(f"Não foi possível baixar o HTML de {url}")
                         continue
@@ -1129,6 +1541,22 @@ def processar_medico(medico, process_id, lock, logger):
                     # Adiciona os candidatos à lista geral
                     for field, values in candidates.items():
                         all_candidates[field].extend(values)
+                    
+                    # Saída antecipada: candidatos suficientes para todos os campos principais
+                    if all(len(all_candidates[f]) >= MIN_CANDIDATOS_CAMPO for f in ('address', 'phone', 'email')):
+                        logger.info("Candidatos suficientes, encerrando a busca nas URLs")
+                        break
+                    
+                    # Saída antecipada: mesmo endereço encontrado em dois domínios diferentes
+                    dominio = urllib.parse.urlparse(url).netloc
+                    consenso = False
+                    for endereco in candidates.get('address', []):
+                        dominios = dominios_endereco.setdefault(normalizar_endereco(endereco).lower(), set())
+                        dominios.add(dominio)
+                        consenso = consenso or len(dominios) >= 2
+                    if consenso:
+                        logger.info("Endereço confirmado por dois domínios, encerrando a busca nas URLs")
+                        break
                 
                 except Exception as e:
                     logger.error(f"Erro ao processar URL {url}: {e}")
@@ -1154,42 +1582,70 @@ def processar_medico(medico, process_id, lock, logger):
                 'email2': ""
             }
             
-            # Processa o endereço
+            # Campos já passados por limpar_texto_extenso (não são limpos de novo no final)
+            ja_limpos = set()
+            
+            # Reúne os candidatos a validar pelo Ollama
+            candidatos_ollama = {}
             if ranked_candidates['address']:
                 address_candidate = ranked_candidates['address'][0]
                 logger.info(f"Candidato a endereço: {address_candidate}")
                 
                 # Extrai o número do endereço
                 address_without_number, number = extrair_numero_endereco(address_candidate)
-                
-                # Consulta o Ollama para validar o endereço
-                prompt = gerar_prompt_ollama(address_without_number, 'address', [], logger)
-                address_validated = consultar_ollama(prompt, logger)
-                address_validated = limpar_texto_extenso(address_validated, 'address', logger)
+                candidatos_ollama['address'] = address_without_number
+            
+            if ranked_candidates['complement']:
+                complement_candidate = ranked_candidates['complement'][0]
+                logger.info(f"Candidato a complemento: {complement_candidate}")
+                candidatos_ollama['complement'] = complement_candidate
+            
+            # Uma única chamada estruturada por médico; se falhar, valida cada campo em paralelo
+            respostas = {}
+            if candidatos_ollama:
+                campos = validar_campos_ollama(candidatos_ollama, logger)
+                if campos is not None:
+                    # Endereço e complemento só quando foram enviados; cidade e bairro são extras
+                    respostas = {
+                        k: v for k, v in campos.items()
+                        if k in candidatos_ollama or (k in ('city', 'bairro') and v)
+                    }
+                else:
+                    prompts = {
+                        tipo: gerar_prompt_ollama(texto, tipo, [], logger)
+                        for tipo, texto in candidatos_ollama.items()
+                    }
+                    respostas = consultar_ollama_lote(prompts, logger)
+            
+            # Processa o endereço
+            if 'address' in respostas:
+                address_validated = limpar_texto_extenso(respostas['address'], 'address', logger)
                 
                 if address_validated and validar_endereco(address_validated):
                     results['address'] = address_validated
                     results['number'] = number
+                    ja_limpos.add('address')
                 else:
                     results['address'] = address_without_number
                     results['number'] = number
             
             # Processa o complemento
-            if ranked_candidates['complement']:
-                complement_candidate = ranked_candidates['complement'][0]
-                logger.info(f"Candidato a complemento: {complement_candidate}")
-                
-                # Consulta o Ollama para validar o complemento
-                prompt = gerar_prompt_ollama(complement_candidate, 'complement', [], logger)
-                complement_validated = consultar_ollama(prompt, logger)
-                complement_validated = limpar_texto_extenso(complement_validated, 'complement', logger)
-                
-                results['complement'] = complement_validated
+            if 'complement' in respostas:
+                results['complement'] = limpar_texto_extenso(respostas['complement'], 'complement', logger)
+                ja_limpos.add('complement')
+            
+            # Processa o bairro (disponível apenas pela chamada estruturada)
+            if respostas.get('bairro'):
+                results['bairro'] = limpar_texto_extenso(respostas['bairro'], 'bairro', logger)
+                ja_limpos.add('bairro')
             
             # Processa a cidade e estado
             if results['address']:
-                # Tenta descobrir a cidade
+                # Tenta descobrir a cidade (ou usa a extraída pelo Ollama)
                 city = descobrir_cidade(results['address'], uf, driver, logger)
+                if not city and respostas.get('city'):
+                    city = limpar_texto_extenso(respostas['city'], 'city', logger)
+                    ja_limpos.add('city')
                 if city:
                     results['city'] = city
                     results['state'] = uf
@@ -1202,7 +1658,7 @@ def processar_medico(medico, process_id, lock, logger):
                 
                 for phone in ranked_candidates['phone']:
                     # Remove caracteres não numéricos
-                    digits = re.sub(r"\D", "", phone)
+                    digits = _RE_NONDIGIT.sub('', phone)
                     
                     # Verifica se é um celular (9 dígitos após o DDD)
                     if len(digits) == 11 and digits[2] == '9':
@@ -1254,27 +1710,21 @@ def processar_medico(medico, process_id, lock, logger):
                 if cep_encontrado:
                     results['cep'] = cep_encontrado
             
-            # Limpa os resultados
-            for field in results:
-                if results[field]:
-                    results[field] = limpar_texto_extenso(results[field], field, logger)
-            
-            # Fecha o driver
-            driver.quit()
+            # Limpa os resultados que ainda não foram limpos
+            for field, valor in results.items():
+                if valor and field not in ja_limpos:
+                    results[field] = limpar_texto_extenso(valor, field, logger)
             
             # Retorna os resultados
             return results
         
         except Exception as e:
             logger.error(f"Erro ao processar médico {firstname} {lastname}: {e}")
-            
-            # Fecha o driver em caso de erro
-            try:
-                driver.quit()
-            except:
-                pass
-            
             return {}
+        
+        finally:
+            # Limpa o estado do navegador para o próximo médico
+            resetar_driver(driver)
     
     except Exception as e:
         logger.error(f"Erro crítico ao processar médico: {e}")
@@ -1282,36 +1732,112 @@ def processar_medico(medico, process_id, lock, logger):
 
 def processar_chunk(chunk, process_id):
     """Processa um chunk de médicos"""
-    # Configura o logger para este processo
-    logger = setup_logger(process_id)
-    logger.info(f"Iniciando processo {process_id} com {len(chunk)} médicos")
+    # Usa o logger do processo do pool (ou cria um, fora do pool)
+    logger = _WORKER_LOGGER or setup_logger(process_id)
+    logger.info(f"Iniciando chunk {process_id} com {len(chunk)} médicos")
     
-    # Cria um lock para este processo
-    lock = multiprocessing.Manager().Lock()
+    # Um único navegador para todos os médicos do chunk
+    try:
+        driver = criar_driver()
+    except Exception as e:
+        logger.error(f"Erro ao criar driver para o chunk {process_id}: {e}")
+        return [(medico, None) for medico in chunk]
     
     # Processa cada médico no chunk
     results = []
-    for medico in chunk:
+    try:
+        for medico in chunk:
+            results.append(_processar_medico_no_chunk(medico, process_id, logger, driver))
+    finally:
         try:
-            # Marca o tempo de início
-            start_time = time.time()
-            
-            # Processa o médico
-            result = processar_medico(medico, process_id, lock, logger)
-            
-            # Registra o tempo de execução
-            elapsed = time.time() - start_time
-            logger.info(f"Tempo de execução: {elapsed:.2f} segundos")
-            
-            # Adiciona o resultado à lista
-            results.append((medico, result))
-            
-        except Exception as e:
-            logger.error(f"Erro ao processar médico {medico.get('Firstname', '')} {medico.get('LastName', '')}: {e}")
-            results.append((medico, {}))
+            driver.quit()
+        except Exception:
+            pass
+        
+        # Espera a gravação dos HTMLs de debug pendentes: o Pool encerra os workers ao sair,
+        # e a thread daemon morreria com a fila ainda cheia
+        if DEBUG_HTML and _DEBUG_HTML_QUEUE is not None:
+            _DEBUG_HTML_QUEUE.join()
     
     return results
 
+def _processar_medico_no_chunk(medico, process_id, logger, driver):
+    """Processa um médico do chunk, medindo o tempo e isolando erros"""
+    try:
+        # Marca o tempo de início
+        start_time = time.time()
+        
+        # Processa o médico
+        result = processar_medico(medico, process_id, logger, driver)
+            
+        # Registra o tempo de execução
+        elapsed = time.time() - start_time
+        logger.info(f"Tempo de execução: {elapsed:.2f} segundos")
+        
+        return (medico, result)
+        
+    except Exception as e:
+        logger.error(f"Erro ao processar médico {medico.get('Firstname', '')} {medico.get('LastName', '')}: {e}")
+        # None (e não {}) marca a falha: o médico fica fora da saída e é tentado de novo na retomada
+        return (medico, None)
+
+# Estado de cada processo do pool, preparado uma única vez em _worker_init
+_WORKER_LOGGER = None
+
+def _worker_init(data_dir):
+    """Inicializa o processo do pool: listas externas e logger"""
+    global TEXTOS_REMOVER, EMAIL_BLACKLIST, SITE_BLACKLIST, _EMAIL_BAD_RE, _WORKER_LOGGER
+    
+    # Recarrega as listas (necessário quando o start method não é fork)
+    TEXTOS_REMOVER = carregar_lista_arquivo(os.path.join(data_dir, 'textos_remover.txt')) or TEXTOS_REMOVER
+    EMAIL_BLACKLIST = carregar_lista_arquivo(os.path.join(data_dir, 'email_blacklist.txt')) or EMAIL_BLACKLIST
+    SITE_BLACKLIST = carregar_lista_arquivo(os.path.join(data_dir, 'site_blacklist.txt')) or SITE_BLACKLIST
+    _EMAIL_BAD_RE = compilar_termos_bloqueados(TERMOS_PROIBIDOS + EMAIL_BLACKLIST)
+    
+    _WORKER_LOGGER = setup_logger(os.getpid())
+
+def _processar_chunk_worker(args):
+    """Desempacota (chunk, id) para uso com pool.imap"""
+    chunk_id, chunk = args
+    return processar_chunk(chunk, chunk_id)
+
+# Campos do CSV de saída
+CSV_FIELDNAMES = [
+    'Hash', 'CRM', 'UF', 'Firstname', 'LastName', 'Medical specialty',
+    'Endereco Completo A1', 'Address A1', 'Numero A1', 'Complement A1', 'Bairro A1',
+    'postal code A1', 'City A1', 'State A1', 'Phone A1', 'Phone A2',
+    'Cell phone A1', 'Cell phone A2', 'E-mail A1', 'E-mail A2',
+    'OPT-IN', 'STATUS', 'LOTE'
+]
+
+def montar_linha_csv(medico, result):
+    """Monta a linha do CSV de saída a partir do médico e do resultado"""
+    return {
+        'Hash': '',
+        'CRM': medico.get('CRM', ''),
+        'UF': medico.get('UF', ''),
+        'Firstname': medico.get('Firstname', ''),
+        'LastName': medico.get('LastName', ''),
+        'Medical specialty': medico.get('Medical specialty', ''),
+        'Endereco Completo A1': f"{result.get('address', '')}, {result.get('number', '')}" if result.get('address') else '',
+        'Address A1': result.get('address', ''),
+        'Numero A1': result.get('number', ''),
+        'Complement A1': result.get('complement', ''),
+        'Bairro A1': result.get('bairro', ''),
+        'postal code A1': result.get('cep', ''),
+        'City A1': result.get('city', ''),
+        'State A1': result.get('state', ''),
+        'Phone A1': result.get('phone', ''),
+        'Phone A2': result.get('phone2', ''),
+        'Cell phone A1': result.get('cellphone', ''),
+        'Cell phone A2': result.get('cellphone2', ''),
+        'E-mail A1': result.get('email', ''),
+        'E-mail A2': result.get('email2', ''),
+        'OPT-IN': '',
+        'STATUS': '',
+        'LOTE': ''
+    }
+
 def main():
     """Função principal"""
     # Verifica os argumentos
@@ -1329,7 +1855,7 @@ def main():
     
     # Configura o logger principal
     logger = setup_logger("main")
-    logger.info("Iniciando processamento sequencial")
+    logger.info("Iniciando processamento paralelo")
     
     # Carrega os médicos do arquivo CSV
     medicos = []
@@ -1344,68 +1870,54 @@ def main():
         logger.error(f"Erro ao carregar arquivo {input_file}: {e}")
         sys.exit(1)
     
-    # Processa cada médico sequencialmente
-    all_results = []
-    for medico in medicos:
-        # Cria um lock simples (não multiprocessing)
-        lock = threading.Lock()
-        
-        # Processa o médico
-        result = processar_medico(medico, 0, lock, logger)
-        all_results.append((medico, result))
-    
-    logger.info(f"Processamento concluído, salvando resultados em {output_file}")
-    
-    # Salva os resultados no arquivo CSV
+    # Retomada: pula os médicos que já estão no arquivo de saída
+    seen_crms = set()
+    retomar = os.path.exists(output_file) and os.path.getsize(output_file) > 0
+    if retomar:
+        with open(output_file, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                seen_crms.add((row.get('CRM', ''), row.get('UF', '')))
+        medicos = [m for m in medicos if (m.get('CRM', ''), m.get('UF', '')) not in seen_crms]
+        logger.info(f"Retomando: {len(seen_crms)} médicos já processados, {len(medicos)} restantes")
+        logger.info(f"O arquivo {output_file} já existe: os novos resultados serão acrescentados ao final dele, sem sobrescrever")
+    
+    if not medicos:
+        logger.info("Nenhum médico para processar")
+        return
+    
+    # Divide os médicos em chunks e processa os chunks em paralelo
+    num_processes = min(NUM_PROCESSES, len(medicos)) or 1
+    chunks = [medicos[i:i + TAMANHO_CHUNK] for i in range(0, len(medicos), TAMANHO_CHUNK)]
+    logger.info(f"Processando {len(chunks)} chunks com {num_processes} processos")
+    
+    # Grava cada resultado assim que o chunk termina (a saída não fica em memória);
+    # médicos que falharam não são gravados, para que a retomada os processe de novo
+    falhas = 0
     try:
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            # Define os campos do CSV
-            fieldnames = [
-                'Hash', 'CRM', 'UF', 'Firstname', 'LastName', 'Medical specialty',
-                'Endereco Completo A1', 'Address A1', 'Numero A1', 'Complement A1', 'Bairro A1',
-                'postal code A1', 'City A1', 'State A1', 'Phone A1', 'Phone A2',
-                'Cell phone A1', 'Cell phone A2', 'E-mail A1', 'E-mail A2',
-                'OPT-IN', 'STATUS', 'LOTE'
-            ]
+        with open(output_file, 'a' if retomar else 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+            if not retomar:
+                writer.writeheader()
             
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for medico, result in all_results:
-                # Cria uma linha para o CSV
-                row = {
-                    'Hash': '',
-                    'CRM': medico.get('CRM', ''),
-                    'UF': medico.get('UF', ''),
-                    'Firstname': medico.get('Firstname', ''),
-                    'LastName': medico.get('LastName', ''),
-                    'Medical specialty': medico.get('Medical specialty', ''),
-                    'Endereco Completo A1': f"{result.get('address', '')}, {result.get('number', '')}" if result.get('address') else '',
-                    'Address A1': result.get('address', ''),
-                    'Numero A1': result.get('number', ''),
-                    'Complement A1': result.get('complement', ''),
-                    'Bairro A1': result.get('bairro', ''),
-                    'postal code A1': result.get('cep', ''),
-                    'City A1': result.get('city', ''),
-                    'State A1': result.get('state', ''),
-                    'Phone A1': result.get('phone', ''),
-                    'Phone A2': result.get('phone2', ''),
-                    'Cell phone A1': result.get('cellphone', ''),
-                    'Cell phone A2': result.get('cellphone2', ''),
-                    'E-mail A1': result.get('email', ''),
-                    'E-mail A2': result.get('email2', ''),
-                    'OPT-IN': '',
-                    'STATUS': '',
-                    'LOTE': ''
-                }
-                
-                writer.writerow(row)
+            with multiprocessing.Pool(processes=num_processes, initializer=_worker_init, initargs=(DATA_DIR,)) as pool:
+                for chunk_results in pool.imap(_processar_chunk_worker, enumerate(chunks)):
+                    for medico, result in chunk_results:
+                        if result is None:
+                            falhas += 1
+                            continue
+                        writer.writerow(montar_linha_csv(medico, result))
+                        f.flush()
         
         logger.info(f"Resultados salvos em {output_file}")
+        if falhas:
+            logger.warning(f"{falhas} médicos falharam e não foram gravados; rode de novo com a mesma saída para tentá-los outra vez")
     
     except Exception as e:
         logger.error(f"Erro ao salvar resultados em {output_file}: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
+    # forkserver evita herdar o estado do processo principal em cada worker
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method('forkserver')
     main()
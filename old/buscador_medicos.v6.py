@@ -30,34 +30,77 @@ import sys
 import csv
 import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
+import logging.handlers
 import time
 import os
 import json
+import sqlite3
 import multiprocessing
-from multiprocessing import Pool, Manager, Lock
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import StaleElementReferenceException
-from collections import Counter
-import math
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from collections import Counter, OrderedDict, defaultdict
 import tempfile
 import shutil
 import traceback
 import hashlib
+import random
+import functools
+import gc
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import psutil
 from datetime import datetime
 import urllib.parse
 import unicodedata
 
+try:
+    import lxml.html  # Parser C para o BeautifulSoup, bem mais rápido que o html.parser
+    from lxml import etree
+    BS_PARSER = 'lxml'
+except ImportError:
+    lxml = None
+    BS_PARSER = 'html.parser'
+
+try:
+    from selectolax.lexbor import LexborHTMLParser  # Parser C (lexbor) para extrações pontuais
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import asyncio
+    import aiohttp  # Downloads simultâneos das páginas candidatas (opcional)
+except ImportError:
+    aiohttp = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv  # Leitor de CSV em C, para entradas grandes (opcional)
+except ImportError:
+    pacsv = None
+
+try:
+    import re2  # google-re2: varre todos os padrões de uma vez (opcional)
+except ImportError:
+    re2 = None
+
 # Configurações
 SEARX_URL   = "http://124.81.6.163:8092/search"
 OLLAMA_URL  = "http://124.81.6.163:11434/api/generate"
 VIACEP_URL  = "https://viacep.com.br/ws/{uf}/{cidade}/{rua}/json/"
 BRASILAPI_URL = "https://brasilapi.com.br/api/cep/v2/{cep}"
 CORREIOS_URL = "https://buscacepinter.correios.com.br/app/endereco/index.php"
+CORREIOS_ESPERA_MAX = 10  # Segundos de espera pelos elementos do site dos Correios
+CORREIOS_API_URL = "https://buscacepinter.correios.com.br/app/endereco/carrega-cep-endereco.php"
 USER_AGENT  = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -66,8 +109,10 @@ USER_AGENT  = (
 MAX_RESULTS = 15
 
 # Configurações de paralelismo
-NUM_PROCESSES = max(1, multiprocessing.cpu_count() - 1)
-CHUNK_SIZE = 10
+# O gargalo é a latência de rede (buscas, páginas, APIs de CEP), não a CPU: mais
+# processos que isso só aumentam a troca de contexto. Com aiohttp cada worker já baixa
+# as páginas em paralelo, então bastam poucos processos. BUSCADOR_WORKERS sobrescreve.
+NUM_PROCESSES = int(os.environ.get("BUSCADOR_WORKERS", 0)) or max(1, min(4 if aiohttp else 16, multiprocessing.cpu_count() - 1))
 
 # Caminhos dos arquivos
 DATA_DIR = 'data'
@@ -78,27 +123,94 @@ EMAIL_BLACKLIST_FILE = os.path.join(DATA_DIR, 'email_blacklist.txt')
 SITE_BLACKLIST_FILE = os.path.join(DATA_DIR, 'site_blacklist.txt')
 LOG_DIR = os.path.join(DATA_DIR, 'logmulti')
 DEBUG_HTML_DIR = os.path.join(DATA_DIR, 'debug_html_v6')
+DEBUG_HTML = os.environ.get("BUSCADOR_DEBUG") == "1"  # Salva os HTMLs baixados apenas com BUSCADOR_DEBUG=1
 CACHE_DIR = os.path.join(DATA_DIR, 'cache')
-CEP_CACHE_FILE = os.path.join(CACHE_DIR, 'cep_cache.json')
+CEP_CACHE_FILE = os.path.join(CACHE_DIR, 'cep_cache.json')  # Formato antigo, importado para o SQLite
+CEP_CACHE_DB = os.path.join(CACHE_DIR, 'cep_cache.sqlite')
 
 # Criar diretórios necessários
-for dir_path in [DATA_DIR, DEBUG_HTML_DIR, LOG_DIR, CACHE_DIR]:
+for dir_path in [DATA_DIR, LOG_DIR, CACHE_DIR] + ([DEBUG_HTML_DIR] if DEBUG_HTML else []):
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
 
 # Padrões regex
 PATTERNS = {
     'address': re.compile(r"(?:Av\.|Rua|Travessa|Estrada)[^,\n]{5,100},?\s*\d{1,5}"),
-    'phone':   re.compile(r"\(\d{2}\)\s?\d{4,5}-\d{4}"),
+    'phone':   re.compile(r"\(\d{2}\)\s?\d{4,5}-\d{4}(?!\d)"),
     'email':   re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
     'complement': re.compile(r"(?:Sala|Bloco|Apt\.?|Conjunto)[^,\n]{1,50}"),
     'cep':     re.compile(r"\d{5}-\d{3}|\d{8}")
 }
 
+# Telefone completo (DDD, prefixo e final em grupos), usado com fullmatch para validar e normalizar
+PHONE_RE = re.compile(r"\(?(\d{2})\)?[\s-]?(\d{4,5})[\s-]?(\d{4})")
+EMAIL_RE = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
+
+# No RE2, \d e \s só cobrem ASCII; estas são as classes equivalentes às do re em texto Unicode
+# (o &nbsp; decodificado vira \xa0, que o \s do re aceita)
+RE2_DIGITO = r'\p{Nd}'
+RE2_ESPACO = r'[\t\n\x0b\f\r\x1c-\x1f \x85\xa0\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]'
+
+def padrao_para_re2(padrao):
+    """Versão do padrão para o RE2: sem o lookahead de fim de número (não suportado) e com dígitos e espaços Unicode"""
+    # Sem o lookahead o padrão casa um pouco mais que o do re, o que basta para um pré-filtro:
+    # o limite do número continua sendo conferido pelo findall do re.
+    # Os padrões de PATTERNS não usam \d ou \s dentro de [...], então a troca direta é segura
+    padrao = padrao.replace(r'(?!\d)', '')
+    return padrao.replace(r'\d', RE2_DIGITO).replace(r'\s', RE2_ESPACO)
+
+def compilar_conjunto_padroes(patterns):
+    """Compila os padrões num único RE2 Set; retorna (set, chaves) ou (None, [])"""
+    if re2 is None:
+        return None, []
+    try:
+        conjunto = re2.Set.SearchSet()
+        chaves = []
+        for chave, padrao in patterns.items():
+            conjunto.Add(padrao_para_re2(padrao.pattern))
+            chaves.append(chave)
+        conjunto.Compile()
+        return conjunto, chaves
+    except Exception as e:
+        print(f"Erro ao compilar RE2 Set, usando apenas o re: {e}")
+        return None, []
+
+PATTERNS_SET, PATTERNS_SET_CHAVES = compilar_conjunto_padroes(PATTERNS)
+
+def padroes_presentes(text):
+    """Indica quais padrões ocorrem no texto, com uma única varredura RE2 (todos, sem RE2)"""
+    if PATTERNS_SET is None:
+        return set(PATTERNS)
+    # O Match devolve None quando nenhum padrão ocorre
+    return {PATTERNS_SET_CHAVES[i] for i in PATTERNS_SET.Match(text) or ()}
+
 # Configuração de logging para multiprocessamento
-def setup_logger(process_id):
+# Formato comum dos logs (o PID identifica o worker no arquivo único)
+LOG_FORMAT = '%(asctime)s - P%(process)d - %(levelname)s - %(message)s'
+
+def iniciar_log_central():
+    """Cria a fila de logs dos workers e a thread que grava o arquivo e o console no processo principal"""
+    log_queue = multiprocessing.Queue(-1)
+    
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(os.path.join(LOG_DIR, 'buscador_medicos_v6.log'), 'w', 'utf-8')
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    return log_queue, listener
+
+def setup_logger(process_id, log_queue=None):
     logger = logging.getLogger(f"process_{process_id}")
     logger.setLevel(logging.INFO)
+    logger.propagate = False
+    
+    # Nos workers, os registros vão pela fila até o processo principal
+    if log_queue is not None:
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        return logger
     
     # Cria um handler para arquivo
     file_handler = logging.FileHandler(os.path.join(LOG_DIR, f'buscador_medicos_v6_p{process_id}.log'), 'w', 'utf-8')
@@ -109,7 +221,7 @@ def setup_logger(process_id):
     console_handler.setLevel(logging.INFO)
     
     # Define o formato
-    formatter = logging.Formatter('%(asctime)s - P%(process)d - %(levelname)s - %(message)s')
+    formatter = logging.Formatter(LOG_FORMAT)
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
     
@@ -155,43 +267,216 @@ if not SITE_BLACKLIST:
         f.write("google.com\nbing.com\nyahoo.com")
     SITE_BLACKLIST = carregar_lista_arquivo(SITE_BLACKLIST_FILE)
 
-# Sistema de cache para CEPs
-def carregar_cache_cep():
-    """Carrega o cache de CEPs do arquivo"""
+# Sistema de cache para CEPs (SQLite em modo WAL: seguro entre processos, gravação incremental)
+# Entradas mais velhas que o TTL são refeitas
+CEP_CACHE_TTL = 7 * 24 * 3600
+# Buscas sem resultado também ficam registradas, por menos tempo
+CEP_CACHE_TTL_FALHA = 24 * 3600
+
+_CEP_DB = None
+_CEP_DB_PID = None
+_CEP_DB_LOCK = threading.Lock()
+
+def conexao_cache_cep():
+    """Conexão com o cache de CEPs, uma por processo (não é herdada pelos workers)"""
+    global _CEP_DB, _CEP_DB_PID
+    if _CEP_DB is None or _CEP_DB_PID != os.getpid():
+        _CEP_DB = sqlite3.connect(CEP_CACHE_DB, isolation_level=None, timeout=30, check_same_thread=False)
+        _CEP_DB.execute('PRAGMA journal_mode=WAL')
+        _CEP_DB.execute('PRAGMA synchronous=NORMAL')
+        _CEP_DB.execute('CREATE TABLE IF NOT EXISTS cep (key TEXT PRIMARY KEY, data TEXT, ts INTEGER)')
+        _CEP_DB_PID = os.getpid()
+    return _CEP_DB
+
+def fechar_cache_cep():
+    """Fecha a conexão deste processo com o cache de CEPs (antes de criar o pool: o SQLite
+    não permite que uma conexão aberta atravesse o fork)"""
+    global _CEP_DB, _CEP_DB_PID
+    with _CEP_DB_LOCK:
+        if _CEP_DB is not None and _CEP_DB_PID == os.getpid():
+            _CEP_DB.close()
+        _CEP_DB = None
+        _CEP_DB_PID = None
+
+# Cópia local das entradas já lidas ou gravadas por este processo (chave -> (valor, ts)),
+# para não ir ao SQLite de novo; o SQLite continua sendo o cache compartilhado entre workers
+_CEP_CACHE_LOCAL = {}
+
+def ler_cache_cep(chave, ttl=CEP_CACHE_TTL):
+    """Retorna o valor guardado para a chave (dentro do TTL) ou None"""
+    limite = int(time.time()) - ttl
+    local = _CEP_CACHE_LOCAL.get(chave)
+    if local is not None and local[1] >= limite:
+        return local[0]
+    
+    with _CEP_DB_LOCK:
+        linha = conexao_cache_cep().execute(
+            'SELECT data, ts FROM cep WHERE key = ? AND ts >= ?',
+            (chave, limite)
+        ).fetchone()
+    if not linha:
+        return None
+    valor = json.loads(linha[0])
+    _CEP_CACHE_LOCAL[chave] = (valor, linha[1])
+    return valor
+
+def registrar_cache_cep(chave, valor):
+    """Guarda um CEP no cache"""
+    agora = int(time.time())
+    _CEP_CACHE_LOCAL[chave] = (valor, agora)
+    with _CEP_DB_LOCK:
+        conexao_cache_cep().execute(
+            'INSERT OR REPLACE INTO cep (key, data, ts) VALUES (?, ?, ?)',
+            (chave, json.dumps(valor, ensure_ascii=False), agora)
+        )
+
+def compactar_cache_cep():
+    """Apaga do cache os CEPs e as falhas que já passaram do TTL"""
+    agora = int(time.time())
     try:
-        if os.path.exists(CEP_CACHE_FILE):
-            with open(CEP_CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        with _CEP_DB_LOCK:
+            conexao = conexao_cache_cep()
+            apagadas = conexao.execute(
+                "DELETE FROM cep WHERE (key LIKE 'falha:%' AND ts < ?) OR ts < ?",
+                (agora - CEP_CACHE_TTL_FALHA, agora - CEP_CACHE_TTL)
+            ).rowcount
+            if apagadas:
+                conexao.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print(f"Cache de CEP: {apagadas} entradas vencidas removidas")
     except Exception as e:
-        print(f"Erro ao carregar cache de CEP: {e}")
-        return {}
+        print(f"Erro ao compactar cache de CEP: {e}")
 
-def salvar_cache_cep(cache):
-    """Salva o cache de CEPs no arquivo"""
+def chave_falha_cep(metodo, chave):
+    """Chave da falha de um método (cada método tem a sua; os acertos são compartilhados)"""
+    return f"falha:{metodo}:{chave}"
+
+def falhou_recentemente(metodo, chave):
+    """Indica se o método já buscou essa chave sem sucesso dentro de CEP_CACHE_TTL_FALHA"""
+    return ler_cache_cep(chave_falha_cep(metodo, chave), CEP_CACHE_TTL_FALHA) is not None
+
+def registrar_falha_cep(metodo, chave):
+    """Registra que o método não encontrou CEP para a chave"""
+    registrar_cache_cep(chave_falha_cep(metodo, chave), True)
+
+def importar_cache_cep_json():
+    """Importa o cache antigo (cep_cache.json) para o SQLite e renomeia o arquivo"""
+    if not os.path.exists(CEP_CACHE_FILE):
+        return
     try:
-        with open(CEP_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
+        with open(CEP_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        agora = int(time.time())
+        linhas = []
+        for chave, entrada in cache.items():
+            # Entradas do formato antigo (sem data) contam como criadas agora
+            if isinstance(entrada, dict) and 'criado_em' in entrada:
+                linhas.append((chave, json.dumps(entrada['valor'], ensure_ascii=False), int(entrada['criado_em'])))
+            else:
+                linhas.append((chave, json.dumps(entrada, ensure_ascii=False), agora))
+        with _CEP_DB_LOCK:
+            conexao_cache_cep().executemany('INSERT OR IGNORE INTO cep (key, data, ts) VALUES (?, ?, ?)', linhas)
+        os.replace(CEP_CACHE_FILE, CEP_CACHE_FILE + '.importado')
+        print(f"{len(linhas)} CEPs importados de {CEP_CACHE_FILE}")
     except Exception as e:
-        print(f"Erro ao salvar cache de CEP: {e}")
+        print(f"Erro ao importar cache de CEP: {e}")
+
+# Retorno das buscas de CEP quando a fonte não respondeu (erro de rede, timeout, 5xx): diferente
+# de None (fonte respondeu que não há CEP), não é guardado nem como falha no cache
+CEP_SEM_RESPOSTA = object()
+
+# Buscas de CEP em andamento no processo ((função, chave) -> Future), para agrupar chamadas repetidas
+_CEP_EM_ANDAMENTO = {}
+_CEP_EM_ANDAMENTO_LOCK = threading.Lock()
 
-# Inicializa o cache de CEPs
-CEP_CACHE = carregar_cache_cep()
+def cache_cep(gerar_chave, campo=None):
+    """Decorador das buscas de CEP: responde pelo cache (com TTL) e guarda os resultados e as falhas
+    
+    gerar_chave recebe os mesmos argumentos da função; o logger é sempre o último.
+    Se a função devolver CEP_SEM_RESPOSTA, nada é guardado e o chamador recebe None.
+    Com campo, guarda {campo: resultado} e devolve só esse campo. Chamadas simultâneas
+    com a mesma chave esperam a busca que já está em andamento, em vez de repeti-la.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            logger = args[-1]
+            chave = gerar_chave(*args)
+            
+            valor = ler_cache_cep(chave)
+            if valor is not None:
+                if campo is not None:
+                    valor = valor.get(campo) if isinstance(valor, dict) else None
+                if valor:
+                    logger.info(f"CEP encontrado no cache: {valor}")
+                    return valor
+            
+            if falhou_recentemente(func.__name__, chave):
+                logger.info(f"{func.__name__} já falhou para {chave}; pulando")
+                return None
+            
+            # Só uma busca por chave de cada vez; as outras aguardam o resultado dela
+            id_busca = (func.__name__, chave)
+            with _CEP_EM_ANDAMENTO_LOCK:
+                futuro = _CEP_EM_ANDAMENTO.get(id_busca)
+                dono = futuro is None
+                if dono:
+                    futuro = _CEP_EM_ANDAMENTO[id_busca] = Future()
+            
+            if not dono:
+                logger.info(f"Aguardando busca de CEP já em andamento: {chave}")
+                return futuro.result()
+            
+            try:
+                resultado = func(*args)
+                if resultado is CEP_SEM_RESPOSTA:
+                    # Fonte fora do ar: a próxima chamada tenta de novo
+                    resultado = None
+                elif resultado:
+                    registrar_cache_cep(chave, {campo: resultado} if campo is not None else resultado)
+                else:
+                    registrar_falha_cep(func.__name__, chave)
+                futuro.set_result(resultado)
+                return resultado
+            except BaseException as e:
+                futuro.set_exception(e)
+                raise
+            finally:
+                with _CEP_EM_ANDAMENTO_LOCK:
+                    del _CEP_EM_ANDAMENTO[id_busca]
+        return wrapper
+    return decorador
 
+@functools.lru_cache(maxsize=8192)
 def normalizar_texto(texto):
     """Remove acentos e converte para minúsculas"""
     if not texto:
         return ""
     # Remove acentos
     texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('ASCII')
-    # Converte para minúsculas
-    texto = texto.lower()
+    # Converte para minúsculas (o texto já é ASCII aqui, então casefold equivale a lower)
+    texto = texto.casefold()
     # Remove caracteres especiais
     texto = re.sub(r'[^\w\s]', ' ', texto)
     # Substitui múltiplos espaços por um único
     texto = re.sub(r'\s+', ' ', texto).strip()
     return texto
 
+# Abreviações de logradouro no início do endereço normalizado (já sem acentos e pontuação,
+# por isso não há 'pç' nem ponto depois da abreviação)
+ABREV_EXPANDIDAS = {
+    'r': 'rua',
+    'av': 'avenida',
+    'trav': 'travessa',
+    'tv': 'travessa',
+    'pc': 'praca',
+    'pca': 'praca',
+    'al': 'alameda',
+    'est': 'estrada',
+    'rod': 'rodovia'
+}
+ABREV_RE = re.compile(r'^(r|av|trav|tv|pca|pc|al|est|rod) ')
+
+@functools.lru_cache(maxsize=8192)
 def normalizar_endereco(endereco):
     """Normaliza o endereço para busca de CEP"""
     if not endereco:
@@ -200,30 +485,14 @@ def normalizar_endereco(endereco):
     # Normaliza o texto (remove acentos, converte para minúsculas)
     endereco = normalizar_texto(endereco)
     
-    # Padroniza abreviações comuns
-    abreviacoes = {
-        'r ': 'rua ',
-        'r. ': 'rua ',
-        'av ': 'avenida ',
-        'av. ': 'avenida ',
-        'trav ': 'travessa ',
-        'trav. ': 'travessa ',
-        'pç ': 'praca ',
-        'pç. ': 'praca ',
-        'pc ': 'praca ',
-        'pc. ': 'praca ',
-        'al ': 'alameda ',
-        'al. ': 'alameda ',
-        'est ': 'estrada ',
-        'est. ': 'estrada '
-    }
-    
-    for abrev, completo in abreviacoes.items():
-        if endereco.startswith(abrev):
-            endereco = completo + endereco[len(abrev):]
+    # Padroniza abreviações comuns (uma única regex ancorada)
+    m = ABREV_RE.match(endereco)
+    if m:
+        endereco = ABREV_EXPANDIDAS[m.group(1)] + ' ' + endereco[m.end():]
     
     return endereco
 
+@functools.lru_cache(maxsize=8192)
 def normalizar_cidade(cidade):
     """Normaliza o nome da cidade para busca de CEP"""
     if not cidade:
@@ -245,22 +514,60 @@ def gerar_chave_cache(rua, cidade, uf):
     # Normaliza os componentes
     rua_norm = normalizar_endereco(rua)
     cidade_norm = normalizar_cidade(cidade)
-    uf_norm = uf.upper() if uf else ""
+    uf_norm = uf.strip().upper() if uf else ""
     
     # Gera a chave
     return f"{rua_norm}|{cidade_norm}|{uf_norm}"
 
+# Sessão HTTP do processo (keep-alive e pool de conexões), criada em setup_worker
+_SESSION = None
+
+def obter_sessao():
+    """Retorna a sessão HTTP do processo, criando-a na primeira chamada"""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        _SESSION.mount('https://', adapter)
+        _SESSION.mount('http://', adapter)
+        _SESSION.headers.update({'User-Agent': USER_AGENT})
+    return _SESSION
+
 def is_blacklisted_site(url):
     """Verifica se o site está na blacklist"""
     return any(domain in url.lower() for domain in SITE_BLACKLIST)
 
+# Redes sociais, vídeos e anúncios: nunca trazem endereço/telefone de consultório aproveitável
+_RE_URL_INUTIL = re.compile(
+    r'(?:facebook\.com|linkedin\.com/redir|youtube\.com|youtu\.be|twitter\.com|x\.com/|instagram\.com|tiktok\.com'
+    r'|/ads?/|doubleclick|googleadservices)',
+    re.IGNORECASE
+)
+# Parâmetros de rastreamento que só mudam a URL, não a página
+_PARAMS_RASTREIO = ('utm_', 'gclid', 'fbclid', 'srsltid', 'msclkid')
+
+def normalizar_url(url):
+    """Remove fragmento e parâmetros de rastreamento da URL"""
+    partes = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode([
+        (k, v) for k, v in urllib.parse.parse_qsl(partes.query, keep_blank_values=True)
+        if not k.lower().startswith(_PARAMS_RASTREIO)
+    ])
+    return partes._replace(query=query, fragment='').geturl()
+
+def filtrar_urls(urls):
+    """URLs únicas (após normalizar) e fora da lista de domínios inúteis, na ordem em que chegaram"""
+    return [url for url in dict.fromkeys(normalizar_url(u) for u in urls) if not _RE_URL_INUTIL.search(url)]
+
 def normalize_phone(raw):
     """Normaliza telefones para formato padrão"""
-    digits = re.sub(r"\D", "", raw)
-    if len(digits) == 11:
-        return f"({digits[:2]}) {digits[2:7]}-{digits[7:]}"
-    if len(digits) == 10:
-        return f"({digits[:2]}) {digits[2:6]}-{digits[6:]}"
+    m = PHONE_RE.fullmatch(raw.strip())
+    if m:
+        return f"({m.group(1)}) {m.group(2)}-{m.group(3)}"
     return raw
 
 def build_query(m, logger):
@@ -272,7 +579,7 @@ def build_query(m, logger):
 def search_searx(query, logger):
     """Busca usando SearX"""
     try:
-        resp = requests.get(SEARX_URL, params={'format':'json','q':query}, timeout=10).json()
+        resp = obter_sessao().get(SEARX_URL, params={'format':'json','q':query}, timeout=10).json()
         urls = [r['url'] for r in resp.get('results', [])][:MAX_RESULTS]
         logger.info(f"SearX results: {len(urls)} URLs")
         return urls
@@ -280,6 +587,13 @@ def search_searx(query, logger):
         logger.error(f"SearX error: {e}")
         return []
 
+# Recursos que o Chrome não precisa baixar para extrair texto
+URLS_BLOQUEADAS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff*', '*.ttf', '*.css', '*.mp4',
+    '*analytics*', '*doubleclick*', '*googletag*', '*googlesyndication*'
+]
+
 def make_driver():
     """Cria e configura o driver do Chrome"""
     opts = Options()
@@ -300,65 +614,130 @@ def make_driver():
     opts.add_argument('--media-cache-size=1')  # Minimiza cache de mídia
     opts.add_argument('--aggressive-cache-discard')  # Descarta cache agressivamente
     
-    return webdriver.Chrome(options=opts)
+    driver = webdriver.Chrome(options=opts)
+    
+    # Bloqueia imagens, fontes, CSS e rastreadores via DevTools e recusa downloads
+    try:
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': URLS_BLOQUEADAS})
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Page.setDownloadBehavior', {'behavior': 'deny'})
+    except Exception as e:
+        print(f"Não foi possível configurar bloqueios via CDP: {e}")
+    
+    return driver
 
-def search_google(query, driver, logger):
-    """Busca usando Google"""
-    driver.get(f"https://www.google.com/search?q={requests.utils.quote(query)}")
-    time.sleep(1)
-    urls = []
-    page_text = driver.page_source
+class DriverSobDemanda:
+    """Driver do Chrome aberto só no primeiro uso: médicos resolvidos apenas com HTTP não sobem o navegador"""
+    
+    def __init__(self):
+        self._driver = None
+    
+    @property
+    def iniciado(self):
+        return self._driver is not None
     
+    def __getattr__(self, nome):
+        if self._driver is None:
+            self._driver = make_driver()
+        return getattr(self._driver, nome)
+    
+    def quit(self):
+        if self._driver is not None:
+            driver, self._driver = self._driver, None
+            driver.quit()
+
+# Respostas que indicam bloqueio ou página que só funciona com JavaScript
+_RE_PAGINA_EXIGE_JS = re.compile(
+    r'unusual traffic|/sorry/index|enablejs|<noscript>\s*<meta[^>]+refresh',
+    re.IGNORECASE
+)
+
+def baixar_pagina_busca(url, logger):
+    """Baixa uma página de resultados via HTTP; retorna '' se ela exigir JavaScript ou bloquear a busca"""
     try:
-        maps_elements = driver.find_elements(By.CSS_SELECTOR, 'a[href*="maps.google"]')
-        for a in maps_elements:
-            try:
-                href = a.get_attribute('href')
-                if href and href not in urls:
-                    urls.append(href)
-            except StaleElementReferenceException:
-                continue
+        r = obter_sessao().get(url, timeout=10)
+        if r.status_code == 200 and len(r.text) >= 1024 and not _RE_PAGINA_EXIGE_JS.search(r.text):
+            return r.text
+        logger.info(f"Página de busca sem HTML utilizável via HTTP (status {r.status_code}): {url}")
     except Exception as e:
-        logger.warning(f"Erro ao buscar elementos do Google Maps: {e}")
+        logger.warning(f"Erro ao baixar página de busca {url}: {e}")
+    return ''
+
+def baixar_pagina_selenium(url, driver):
+    """Abre a página no Chrome e retorna o HTML renderizado"""
+    driver.get(url)
+    time.sleep(1)
+    return driver.page_source
+
+def obter_pagina_busca(url, driver, logger):
+    """HTML de uma página de resultados: via HTTP e, se não servir, via Selenium"""
+    return baixar_pagina_busca(url, logger) or baixar_pagina_selenium(url, driver)
+
+def extrair_links_google(page_text):
+    """Extrai os links de resultado (e do Google Maps) do HTML de busca do Google"""
+    soup = BeautifulSoup(page_text, BS_PARSER)
+    urls = []
     
-    for a in driver.find_elements(By.CSS_SELECTOR,'div.yuRUbf a'):
-        try:
-            href = a.get_attribute('href')
-        except StaleElementReferenceException:
-            continue
+    for a in soup.select('a[href*="maps.google"]'):
+        href = a.get('href')
+        if href and href not in urls:
+            urls.append(href)
+    
+    # div.yuRUbf é o layout com JavaScript; /url?q= é o layout do HTML estático
+    for a in soup.select('div.yuRUbf a, a[href^="/url?"]'):
+        href = a.get('href', '')
+        if href.startswith('/url?'):
+            href = urllib.parse.parse_qs(urllib.parse.urlparse(href).query).get('q', [''])[0]
+        if href.startswith('http') and not is_blacklisted_site(href):
+            urls.append(href)
+        if len(urls) >= MAX_RESULTS: break
+    
+    return urls
+
+def extrair_links_bing(page_text):
+    """Extrai os links de resultado do HTML de busca do Bing"""
+    soup = BeautifulSoup(page_text, BS_PARSER)
+    urls = []
+    for a in soup.select('li.b_algo h2 a'):
+        href = a.get('href')
         if href and not is_blacklisted_site(href):
             urls.append(href)
         if len(urls) >= MAX_RESULTS: break
+    return urls
+
+def search_google(query, driver, logger):
+    """Busca usando Google (HTTP direto; Selenium só se a página estática não trouxer resultados)"""
+    url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
+    page_text = baixar_pagina_busca(url, logger)
+    urls = extrair_links_google(page_text) if page_text else []
+    
+    if not urls:
+        page_text = baixar_pagina_selenium(url, driver)
+        urls = extrair_links_google(page_text)
     
     logger.info(f"Google results: {len(urls)} URLs")
     return urls, page_text
 
 def search_bing(query, driver, logger):
-    """Busca usando Bing"""
-    driver.get(f"https://www.bing.com/search?q={requests.utils.quote(query)}")
-    time.sleep(1)
-    urls = []
-    page_text = driver.page_source
+    """Busca usando Bing (HTTP direto; Selenium só se a página estática não trouxer resultados)"""
+    url = f"https://www.bing.com/search?q={requests.utils.quote(query)}"
+    page_text = baixar_pagina_busca(url, logger)
+    urls = extrair_links_bing(page_text) if page_text else []
     
-    for a in driver.find_elements(By.CSS_SELECTOR,'li.b_algo h2 a'):
-        try:
-            href = a.get_attribute('href')
-        except StaleElementReferenceException:
-            continue
-        if href and not is_blacklisted_site(href):
-            urls.append(href)
-        if len(urls) >= MAX_RESULTS: break
+    if not urls:
+        page_text = baixar_pagina_selenium(url, driver)
+        urls = extrair_links_bing(page_text)
     
     logger.info(f"Bing results: {len(urls)} URLs")
     return urls, page_text
 
 def save_debug_html(url, html, logger):
-    """Salva HTML para debug"""
-    if not html:
+    """Salva HTML para debug (apenas com BUSCADOR_DEBUG=1)"""
+    if not html or not DEBUG_HTML:
         return
     
-    # Cria um nome de arquivo baseado no hash da URL
-    url_hash = hashlib.md5(url.encode()).hexdigest()
+    # Cria um nome de arquivo baseado no hash da URL (curto, não criptográfico)
+    url_hash = hashlib.blake2b(url.encode(), digest_size=8).hexdigest()
     filename = os.path.join(DEBUG_HTML_DIR, f"{url_hash}.html")
     
     try:
@@ -376,7 +755,7 @@ def download_html(url, logger, driver=None):
             time.sleep(1)
             html = driver.page_source
         else:
-            r = requests.get(url, timeout=10, headers={'User-Agent': USER_AGENT})
+            r = obter_sessao().get(url, timeout=10)
             if r.status_code == 200:
                 html = r.text
             else:
@@ -389,6 +768,63 @@ def download_html(url, logger, driver=None):
         logger.warning(f"Download fail {url}: {e}")
         return ''
 
+# Páginas que só exibem conteúdo com JavaScript
+_RE_PRECISA_JS = re.compile(
+    r'<noscript>[^<]*(?:enable|habilite|ative)\s+(?:o\s+)?javascript|<meta[^>]+http-equiv=["\']?refresh',
+    re.IGNORECASE
+)
+
+def precisa_renderizar(html):
+    """Indica se o HTML obtido sem navegador precisa ser renderizado pelo Selenium"""
+    return not html or len(html) < 1024 or bool(_RE_PRECISA_JS.search(html))
+
+# Downloads simultâneos por médico quando aiohttp não está instalado
+DOWNLOADS_SIMULTANEOS = 8
+
+async def _baixar_uma_async(sessao, url):
+    async with sessao.get(url) as r:
+        if r.status != 200 or 'html' not in r.headers.get('Content-Type', 'text/html'):
+            return ''
+        return await r.text(errors='replace')
+
+async def _baixar_htmls_async(urls, logger):
+    conector = aiohttp.TCPConnector(limit=32, limit_per_host=4)
+    timeout = aiohttp.ClientTimeout(total=15, connect=5)
+    async with aiohttp.ClientSession(connector=conector, timeout=timeout,
+                                     headers={'User-Agent': USER_AGENT}) as sessao:
+        respostas = await asyncio.gather(*(_baixar_uma_async(sessao, url) for url in urls),
+                                         return_exceptions=True)
+    
+    htmls = {}
+    for url, html in zip(urls, respostas):
+        if isinstance(html, Exception):
+            logger.warning(f"Download fail {url} (aiohttp): {html}")
+        elif html:
+            htmls[url] = html
+    return htmls
+
+def baixar_html_http(url, logger):
+    """Baixa uma página pela sessão HTTP compartilhada, sem tocar no driver"""
+    try:
+        r = obter_sessao().get(url, timeout=10)
+        if r.status_code == 200 and 'html' in r.headers.get('Content-Type', 'text/html'):
+            return r.text
+    except Exception as e:
+        logger.warning(f"Download fail {url}: {e}")
+    return ''
+
+def baixar_htmls(urls, logger):
+    """Baixa várias URLs ao mesmo tempo sem navegador ({url: html}, só as que responderam)"""
+    if not urls:
+        return {}
+    if aiohttp is not None:
+        return asyncio.run(_baixar_htmls_async(urls, logger))
+    
+    # Sem aiohttp, sobrepõe os downloads com threads usando a sessão do processo
+    with ThreadPoolExecutor(max_workers=DOWNLOADS_SIMULTANEOS) as executor:
+        htmls = executor.map(lambda url: baixar_html_http(url, logger), urls)
+        return {url: html for url, html in zip(urls, htmls) if html}
+
 def limpar_endereco(endereco):
     """Limpa o endereço removendo textos indesejados"""
     for texto in TEXTOS_REMOVER:
@@ -423,6 +859,19 @@ def validar_endereco(endereco):
     
     return True
 
+# DDDs em uso no Brasil (ANATEL)
+DDDS_VALIDOS = frozenset({
+    11, 12, 13, 14, 15, 16, 17, 18, 19,
+    21, 22, 24, 27, 28,
+    31, 32, 33, 34, 35, 37, 38,
+    41, 42, 43, 44, 45, 46, 47, 48, 49,
+    51, 53, 54, 55,
+    61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79,
+    81, 82, 83, 84, 85, 86, 87, 88, 89,
+    91, 92, 93, 94, 95, 96, 97, 98, 99,
+})
+
 def validar_telefone(telefone):
     """Valida se o telefone parece válido"""
     if not telefone:
@@ -432,23 +881,20 @@ def validar_telefone(telefone):
     if any(termo in telefone.lower() for termo in ['não posso', 'não é possível', 'ajudar', 'exemplo']):
         return False
     
-    # Remove caracteres não numéricos
-    digits = re.sub(r"\D", "", telefone)
-    
-    # Verifica se tem pelo menos 10 dígitos (mínimo para um telefone válido)
-    if len(digits) < 10:
+    # Verifica o formato (10 ou 11 dígitos com DDD) numa única regex
+    m = PHONE_RE.fullmatch(telefone.strip())
+    if not m:
         return False
     
-    # Verifica se tem no máximo 11 dígitos (máximo para um telefone válido)
-    if len(digits) > 11:
+    # DDD precisa existir (tabela da ANATEL)
+    if int(m.group(1)) not in DDDS_VALIDOS:
         return False
     
-    # Verifica se começa com DDD válido (11-99)
-    ddd = int(digits[:2])
-    if ddd < 11 or ddd > 99:
-        return False
-    
-    return True
+    # Celular (9 dígitos) começa com 9; fixo (8 dígitos) começa com 2 a 5
+    numero = m.group(2)
+    if len(numero) == 5:
+        return numero[0] == '9'
+    return numero[0] in '2345'
 
 def validar_email(email):
     """Valida se o email parece válido"""
@@ -460,7 +906,7 @@ def validar_email(email):
         return False
     
     # Verifica se tem formato básico de email
-    if not re.match(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$', email):
+    if not EMAIL_RE.match(email):
         return False
     
     # Verifica se não contém caracteres especiais ou espaços
@@ -506,26 +952,66 @@ def formatar_cep(cep):
     # Formata como XXXXX-XXX
     return f"{digits[:5]}-{digits[5:]}"
 
+# Elementos cujo texto não é conteúdo visível da página
+_TAGS_SEM_TEXTO = frozenset(['script', 'style'])
+
+def _texto_e_links_bs4(html):
+    """Mesmo resultado de extrair_texto_e_links, pelo BeautifulSoup"""
+    soup = BeautifulSoup(html, BS_PARSER)
+    tels = [a['href'] for a in soup.select("a[href^='tel:']")]
+    mails = [a['href'] for a in soup.select("a[href^='mailto:']")]
+    return soup.get_text(' '), tels, mails
+
+def extrair_texto_e_links(html):
+    """Texto da página e hrefs tel:/mailto: (texto, tels, mails), numa única passada pelo HTML"""
+    if lxml is None:
+        return _texto_e_links_bs4(html)
+    
+    partes, tels, mails = [], [], []
+    try:
+        tree = lxml.html.fromstring(html)
+    except (etree.LxmlError, ValueError):
+        # Documento vazio ou XHTML com declaração de encoding (que o lxml recusa em str):
+        # o BeautifulSoup lê esses casos
+        return _texto_e_links_bs4(html)
+    for evento, el in etree.iterwalk(tree, events=('start', 'end')):
+        if evento == 'start':
+            tag = el.tag
+            if not isinstance(tag, str) or tag in _TAGS_SEM_TEXTO:
+                continue
+            if tag == 'a':
+                href = el.get('href', '')
+                if href.startswith('tel:'):
+                    tels.append(href)
+                elif href.startswith('mailto:'):
+                    mails.append(href)
+            if el.text:
+                partes.append(el.text)
+        elif el.tail:
+            # O tail vem depois do elemento (e dos filhos), então só entra no evento 'end'
+            partes.append(el.tail)
+    return ' '.join(partes), tels, mails
+
 def extract_candidates(html, url, logger):
     """Extrai candidatos de informações do HTML"""
-    soup = BeautifulSoup(html, 'html.parser')
-    text = soup.get_text(' ')
+    text, tel_hrefs, mailto_hrefs = extrair_texto_e_links(html)
     
-    # Extrai usando regex
-    addrs = PATTERNS['address'].findall(text)
-    phones= PATTERNS['phone'].findall(text)
-    emails= PATTERNS['email'].findall(text)
-    comps = PATTERNS['complement'].findall(text)
-    ceps  = PATTERNS['cep'].findall(text)
+    # Extrai usando regex (só roda findall nos padrões que o RE2 Set encontrou)
+    presentes = padroes_presentes(text)
+    addrs = PATTERNS['address'].findall(text) if 'address' in presentes else []
+    phones= PATTERNS['phone'].findall(text) if 'phone' in presentes else []
+    emails= PATTERNS['email'].findall(text) if 'email' in presentes else []
+    comps = PATTERNS['complement'].findall(text) if 'complement' in presentes else []
+    ceps  = PATTERNS['cep'].findall(text) if 'cep' in presentes else []
     
     # Extrai links tel: e mailto:
-    for a in soup.select("a[href^='tel:']"):
-        num = a['href'].split(':',1)[1]
+    for href in tel_hrefs:
+        num = href.split(':',1)[1]
         norm = normalize_phone(num)
         if norm not in phones: phones.append(norm)
     
-    for a in soup.select("a[href^='mailto:']"):
-        mail = a['href'].split(':',1)[1]
+    for href in mailto_hrefs:
+        mail = href.split(':',1)[1]
         if 'subject=' in mail: continue
         if mail not in emails: emails.append(mail)
     
@@ -560,7 +1046,11 @@ def aggregate_and_rank(all_c, logger):
     """Agrega e ranqueia os candidatos"""
     ranked = {}
     for k,lst in all_c.items():
-        ranked[k] = [item for item,_ in Counter(lst).most_common()]
+        # Conta numa passada e ordena as chaves por frequência (empates na ordem de aparição)
+        counts = {}
+        for item in lst:
+            counts[item] = counts.get(item, 0) + 1
+        ranked[k] = sorted(counts, key=counts.__getitem__, reverse=True)
         logger.info(f"Ranked {k}: {len(ranked[k])} items")
     return ranked
 
@@ -573,25 +1063,34 @@ def carregar_exemplos():
         print(f"Erro ao carregar exemplos: {e}")
         return []
 
+# Instruções de seleção de cada campo, usadas nos prompts de validação
+INSTRUCOES_VALIDACAO = {
+    'phone': (
+        "selecione APENAS um número de telefone no formato (XX) XXXX-XXXX ou (XX) XXXXX-XXXX. "
+        "O número deve ser um telefone fixo ou celular válido do Brasil. "
+        "Se não houver um número válido, retorne vazio (''). "
+    ),
+    'email': (
+        "selecione APENAS um endereço de e-mail válido no formato usuario@dominio.com. "
+        "Se não houver um e-mail válido, retorne vazio (''). "
+    ),
+    'address': (
+        "selecione APENAS um endereço completo com rua e número. "
+        "O endereço deve estar no formato 'Rua/Av/Travessa Nome da Rua, Número'. "
+        "Se não houver um endereço válido, retorne vazio (''). "
+    ),
+    'complement': (
+        "selecione APENAS um complemento de endereço válido como 'Sala X', 'Apto Y', 'Conjunto Z'. "
+        "Se não houver um complemento válido, retorne vazio (''). "
+    ),
+}
+
 def criar_prompt_validacao(field, cands, m, exemplos):
     """Cria prompt para validação usando exemplos"""
     prompt = f"Dado o médico {m['Firstname']} {m['LastName']} (CRM {m['CRM']} {m['UF']}), "
     
     # Adiciona instruções específicas para cada campo
-    if field == 'phone':
-        prompt += "selecione APENAS um número de telefone no formato (XX) XXXX-XXXX ou (XX) XXXXX-XXXX. "
-        prompt += "O número deve ser um telefone fixo ou celular válido do Brasil. "
-        prompt += "Se não houver um número válido, retorne vazio (''). "
-    elif field == 'email':
-        prompt += "selecione APENAS um endereço de e-mail válido no formato usuario@dominio.com. "
-        prompt += "Se não houver um e-mail válido, retorne vazio (''). "
-    elif field == 'address':
-        prompt += "selecione APENAS um endereço completo com rua e número. "
-        prompt += "O endereço deve estar no formato 'Rua/Av/Travessa Nome da Rua, Número'. "
-        prompt += "Se não houver um endereço válido, retorne vazio (''). "
-    elif field == 'complement':
-        prompt += "selecione APENAS um complemento de endereço válido como 'Sala X', 'Apto Y', 'Conjunto Z'. "
-        prompt += "Se não houver um complemento válido, retorne vazio (''). "
+    prompt += INSTRUCOES_VALIDACAO.get(field, "")
     
     # Adiciona os candidatos
     prompt += f"Candidatos: {', '.join(cands)}. "
@@ -606,6 +1105,106 @@ def criar_prompt_validacao(field, cands, m, exemplos):
     
     return prompt
 
+def criar_prompt_validacao_lote(cands_by_field, m, exemplos):
+    """Cria um único prompt que pede todos os campos de uma vez, em JSON"""
+    prompt = f"Dado o médico {m['Firstname']} {m['LastName']} (CRM {m['CRM']} {m['UF']}), escolha um valor para cada campo abaixo.\n"
+    
+    for field, cands in cands_by_field.items():
+        prompt += f"\nCampo \"{field}\": {INSTRUCOES_VALIDACAO.get(field, '')}"
+        prompt += f"Candidatos: {', '.join(cands)}. "
+        relevant_examples = [ex for ex in exemplos if field.lower() in ex.lower()][:5]
+        if relevant_examples:
+            prompt += f"Exemplos: {' | '.join(relevant_examples)}. "
+    
+    chaves = ", ".join(f'"{field}"' for field in cands_by_field)
+    prompt += f"\n\nRetorne APENAS um objeto JSON com as chaves {chaves}, usando '' para o campo sem valor válido."
+    
+    return prompt
+
+def validar_resultado_campo(field, result, logger):
+    """Aplica as validações específicas do campo à resposta da IA ('' se inválida)"""
+    if field == 'phone' and not validar_telefone(result):
+        logger.warning(f"Telefone inválido: {result}")
+        return ""
+    
+    if field == 'email' and not validar_email(result):
+        logger.warning(f"Email inválido: {result}")
+        return ""
+    
+    if field == 'address' and not validar_endereco(result):
+        logger.warning(f"Endereço inválido: {result}")
+        return ""
+    
+    return result
+
+# Retentativas e disjuntor das chamadas ao Ollama
+OLLAMA_TENTATIVAS = 3
+OLLAMA_FALHAS_MAX = 5      # Chamadas seguidas sem sucesso que abrem o disjuntor
+OLLAMA_PAUSA_TAREFAS = 10  # Médicos processados sem IA depois que o disjuntor abre
+
+_OLLAMA_FALHAS = 0
+_OLLAMA_PAUSA = 0
+
+def ollama_em_pausa():
+    """Indica se o disjuntor do Ollama está aberto neste worker"""
+    return _OLLAMA_PAUSA > 0
+
+def avancar_pausa_ollama():
+    """Conta uma tarefa concluída com o disjuntor aberto"""
+    global _OLLAMA_PAUSA
+    if _OLLAMA_PAUSA > 0:
+        _OLLAMA_PAUSA -= 1
+
+def _json_completo(texto):
+    """Indica se o texto já é um objeto JSON completo"""
+    texto = texto.strip()
+    if not texto.endswith('}'):
+        return False
+    try:
+        json.loads(texto)
+        return True
+    except ValueError:
+        return False
+
+def consultar_ollama(payload, logger, parar=None):
+    """Envia o prompt ao Ollama em streaming, com retentativas; None se não houver resposta
+    
+    parar(texto_parcial) permite encerrar a leitura assim que a resposta já puder ser usada.
+    """
+    global _OLLAMA_FALHAS, _OLLAMA_PAUSA
+    if ollama_em_pausa():
+        return None
+    
+    for tentativa in range(OLLAMA_TENTATIVAS):
+        try:
+            with obter_sessao().post(OLLAMA_URL, json={**payload, "stream": True}, stream=True, timeout=(3, 20)) as r:
+                r.raise_for_status()
+                texto = ""
+                for linha in r.iter_lines():
+                    if not linha:
+                        continue
+                    parte = json.loads(linha)
+                    texto += parte.get('response', '')
+                    if parte.get('done') or (parar and parar(texto)):
+                        break
+            _OLLAMA_FALHAS = 0
+            return texto.strip()
+        except (requests.Timeout, requests.ConnectionError) as e:
+            # Backoff exponencial com jitter
+            espera = min(4, 2 ** tentativa) * random.uniform(0.5, 1.5)
+            logger.warning(f"Ollama sem resposta (tentativa {tentativa + 1}/{OLLAMA_TENTATIVAS}), aguardando {espera:.1f}s: {e}")
+            time.sleep(espera)
+        except Exception as e:
+            logger.error(f"Erro ao consultar Ollama: {e}")
+            break
+    
+    _OLLAMA_FALHAS += 1
+    if _OLLAMA_FALHAS >= OLLAMA_FALHAS_MAX:
+        logger.warning(f"Ollama falhou {_OLLAMA_FALHAS} vezes seguidas; usando os candidatos por regex nos próximos {OLLAMA_PAUSA_TAREFAS} médicos")
+        _OLLAMA_PAUSA = OLLAMA_PAUSA_TAREFAS
+        _OLLAMA_FALHAS = 0
+    return None
+
 def validate(field, cands, m, logger):
     """Valida candidatos usando IA"""
     if not cands:
@@ -618,34 +1217,78 @@ def validate(field, cands, m, logger):
     prompt = criar_prompt_validacao(field, cands, m, exemplos)
     logger.info(f"Prompt: {prompt}")
     
-    # Chama a API do Ollama
+    # Disjuntor aberto: usa o candidato mais frequente
+    if ollama_em_pausa():
+        return validar_resultado_campo(field, cands[0], logger)
+    
+    # Chama a API do Ollama (a resposta é um único valor: para na primeira quebra de linha)
+    result = consultar_ollama(
+        {"model": "llama3.1:8b", "prompt": prompt},
+        logger,
+        parar=lambda texto: '\n' in texto.strip()
+    )
+    if result is None:
+        return ""
+    
+    result = result.split('\n')[0].strip()
+    logger.info(f"IA response: {result}")
+    
+    # Validações específicas por campo
+    return validar_resultado_campo(field, result, logger)
+
+# Respostas da IA já validadas neste worker, por (UF, campos e candidatos); médicos do mesmo
+# consultório costumam trazer exatamente os mesmos candidatos
+VALIDACAO_CACHE_MAX = 8192
+_VALIDACAO_CACHE = OrderedDict()
+
+def validate_all(cands_by_field, m, logger):
+    """Valida todos os campos com uma única chamada à IA; None se a resposta não puder ser usada"""
+    cands_by_field = {field: cands for field, cands in cands_by_field.items() if cands}
+    if not cands_by_field:
+        return {}
+    
+    chave = (m.get('UF', ''), tuple((field, tuple(cands)) for field, cands in sorted(cands_by_field.items())))
+    if chave in _VALIDACAO_CACHE:
+        _VALIDACAO_CACHE.move_to_end(chave)
+        logger.info("Validação reaproveitada de outro médico com os mesmos candidatos")
+        return dict(_VALIDACAO_CACHE[chave])
+    
+    # Carrega exemplos de treinamento e cria o prompt único
+    exemplos = carregar_exemplos()
+    prompt = criar_prompt_validacao_lote(cands_by_field, m, exemplos)
+    logger.info(f"Prompt (lote): {prompt}")
+    
+    # Chama a API do Ollama pedindo a saída em JSON (para assim que o objeto estiver completo)
+    resposta = consultar_ollama(
+        {"model": "llama3.1:8b", "prompt": prompt, "format": "json"},
+        logger,
+        parar=_json_completo
+    )
+    
+    # Ollama indisponível (ou disjuntor aberto): usa o candidato mais frequente de cada campo
+    if resposta is None:
+        return {field: validar_resultado_campo(field, cands[0], logger) for field, cands in cands_by_field.items()}
+    
     try:
-        resp = requests.post(
-            OLLAMA_URL,
-            json={"model": "llama3.1:8b", "prompt": prompt},
-            timeout=30
-        ).json()
-        
-        result = resp.get('response', '').strip()
-        logger.info(f"IA response: {result}")
+        dados = json.loads(resposta or '{}')
+        logger.info(f"IA response (lote): {dados}")
+        if not isinstance(dados, dict):
+            return None
         
         # Validações específicas por campo
-        if field == 'phone' and not validar_telefone(result):
-            logger.warning(f"Telefone inválido: {result}")
-            return ""
-        
-        if field == 'email' and not validar_email(result):
-            logger.warning(f"Email inválido: {result}")
-            return ""
-        
-        if field == 'address' and not validar_endereco(result):
-            logger.warning(f"Endereço inválido: {result}")
-            return ""
+        validados = {
+            field: validar_resultado_campo(field, str(dados.get(field) or '').strip(), logger)
+            for field in cands_by_field
+        }
         
-        return result
+        # Guarda só respostas que vieram da IA (as do fallback já são baratas)
+        _VALIDACAO_CACHE[chave] = validados
+        if len(_VALIDACAO_CACHE) > VALIDACAO_CACHE_MAX:
+            _VALIDACAO_CACHE.popitem(last=False)
+        return dict(validados)
     except Exception as e:
-        logger.error(f"Erro na validação: {e}")
-        return ""
+        logger.error(f"Erro na validação em lote: {e}")
+        return None
 
 def descobrir_cidade(endereco, uf, driver, logger):
     """Descobre a cidade baseado no endereço"""
@@ -657,12 +1300,9 @@ def descobrir_cidade(endereco, uf, driver, logger):
     logger.info(f"Buscando cidade: {query}")
     
     try:
-        driver.get(f"https://www.google.com/search?q={requests.utils.quote(query)}")
-        time.sleep(1)
-        
         # Extrai o texto da página
-        page_text = driver.page_source
-        soup = BeautifulSoup(page_text, 'html.parser')
+        page_text = obter_pagina_busca(f"https://www.google.com/search?q={requests.utils.quote(query)}", driver, logger)
+        soup = BeautifulSoup(page_text, BS_PARSER)
         text = soup.get_text(' ')
         
         # Lista de cidades do estado
@@ -696,18 +1336,13 @@ def descobrir_cidade(endereco, uf, driver, logger):
         logger.error(f"Erro ao descobrir cidade: {e}")
         return ""
 
+@cache_cep(lambda rua, cidade, uf, *_: gerar_chave_cache(rua, cidade, uf))
 def buscar_dados_via_viacep(rua, cidade, uf, logger):
     """Busca dados via ViaCEP API"""
     if not rua or not cidade or not uf:
         logger.warning("Dados insuficientes para busca no ViaCEP")
         return None
     
-    # Verifica no cache primeiro
-    chave_cache = gerar_chave_cache(rua, cidade, uf)
-    if chave_cache in CEP_CACHE:
-        logger.info(f"CEP encontrado no cache: {CEP_CACHE[chave_cache]}")
-        return CEP_CACHE[chave_cache]
-    
     # Normaliza os parâmetros
     rua_norm = normalizar_endereco(rua)
     cidade_norm = normalizar_cidade(cidade)
@@ -723,7 +1358,12 @@ def buscar_dados_via_viacep(rua, cidade, uf, logger):
     
     try:
         # Faz a requisição
-        response = requests.get(url, timeout=10)
+        response = obter_sessao().get(url, timeout=10)
+        
+        # Sobrecarga ou erro do servidor não dizem nada sobre o endereço
+        if response.status_code == 429 or response.status_code >= 500:
+            logger.warning(f"ViaCEP indisponível (HTTP {response.status_code})")
+            return CEP_SEM_RESPOSTA
         
         # Verifica se a resposta foi bem-sucedida
         if response.status_code == 200:
@@ -735,38 +1375,25 @@ def buscar_dados_via_viacep(rua, cidade, uf, logger):
                 result = data[0]
                 logger.info(f"Dados encontrados no ViaCEP: {result}")
                 
-                # Salva no cache
-                CEP_CACHE[chave_cache] = result
-                salvar_cache_cep(CEP_CACHE)
-                
                 return result
             elif isinstance(data, dict) and not data.get('erro'):
                 logger.info(f"Dados encontrados no ViaCEP: {data}")
                 
-                # Salva no cache
-                CEP_CACHE[chave_cache] = data
-                salvar_cache_cep(CEP_CACHE)
-                
                 return data
         
         logger.warning(f"ViaCEP não retornou dados válidos: {response.text}")
         return None
     except Exception as e:
         logger.error(f"Erro ao buscar no ViaCEP: {e}")
-        return None
+        return CEP_SEM_RESPOSTA
 
+@cache_cep(lambda rua, cidade, uf, *_: gerar_chave_cache(rua, cidade, uf))
 def buscar_cep_via_brasilapi(rua, cidade, uf, logger):
     """Busca CEP via BrasilAPI"""
     if not rua or not cidade or not uf:
         logger.warning("Dados insuficientes para busca na BrasilAPI")
         return None
     
-    # Verifica no cache primeiro
-    chave_cache = gerar_chave_cache(rua, cidade, uf)
-    if chave_cache in CEP_CACHE:
-        logger.info(f"CEP encontrado no cache: {CEP_CACHE[chave_cache]}")
-        return CEP_CACHE[chave_cache]
-    
     # Normaliza os parâmetros
     rua_norm = normalizar_endereco(rua)
     cidade_norm = normalizar_cidade(cidade)
@@ -777,12 +1404,14 @@ def buscar_cep_via_brasilapi(rua, cidade, uf, logger):
     
     try:
         # Faz a busca no Google primeiro para encontrar o CEP
-        response = requests.get(
+        response = obter_sessao().get(
             "https://www.google.com/search",
             params={"q": f"CEP {query}"},
-            headers={"User-Agent": USER_AGENT},
             timeout=10
         )
+        if response.status_code != 200:
+            logger.warning(f"Busca do Google para a BrasilAPI falhou (HTTP {response.status_code})")
+            return CEP_SEM_RESPOSTA
         
         # Extrai CEPs do resultado do Google
         ceps = PATTERNS['cep'].findall(response.text)
@@ -795,7 +1424,10 @@ def buscar_cep_via_brasilapi(rua, cidade, uf, logger):
             url = BRASILAPI_URL.format(cep=cep)
             logger.info(f"Consultando detalhes do CEP na BrasilAPI: {url}")
             
-            response = requests.get(url, timeout=10)
+            response = obter_sessao().get(url, timeout=10)
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"BrasilAPI indisponível (HTTP {response.status_code})")
+                return CEP_SEM_RESPOSTA
             
             if response.status_code == 200:
                 data = response.json()
@@ -811,104 +1443,132 @@ def buscar_cep_via_brasilapi(rua, cidade, uf, logger):
                     "uf": data.get("state", "")
                 }
                 
-                # Salva no cache
-                CEP_CACHE[chave_cache] = result
-                salvar_cache_cep(CEP_CACHE)
-                
                 return result
         
         logger.warning("BrasilAPI não retornou dados válidos")
         return None
     except Exception as e:
         logger.error(f"Erro ao buscar na BrasilAPI: {e}")
-        return None
+        return CEP_SEM_RESPOSTA
+
+# CEP no HTML cru da busca; as bordas evitam pegar pedaços de ids e números longos
+_RE_CEP_HTML = re.compile(r"(?<!\d)(?:\d{5}-\d{3}|\d{8})(?!\d)")
 
+def cep_mais_frequente(html):
+    """Retorna o CEP que mais aparece no HTML (sem montar o DOM), ou ''"""
+    ceps = Counter(formatar_cep(c) for c in _RE_CEP_HTML.findall(html))
+    ceps.pop("", None)
+    return ceps.most_common(1)[0][0] if ceps else ""
+
+@cache_cep(lambda rua, cidade, *_: gerar_chave_cache(rua, cidade, ""), campo='cep')
 def buscar_cep_por_endereco(rua, cidade, driver, logger):
     """Busca CEP baseado na rua e cidade via Google"""
     if not rua or not cidade:
         logger.warning("Rua ou cidade não disponíveis para busca de CEP")
         return ""
     
-    # Verifica no cache primeiro
-    chave_cache = gerar_chave_cache(rua, cidade, "")
-    if chave_cache in CEP_CACHE and "cep" in CEP_CACHE[chave_cache]:
-        logger.info(f"CEP encontrado no cache: {CEP_CACHE[chave_cache]['cep']}")
-        return CEP_CACHE[chave_cache]["cep"]
-    
     # Formata a query de busca
     query = f"CEP da {rua}, {cidade}"
     logger.info(f"Buscando CEP via Google: {query}")
     
-    # Realiza a busca no Google
-    driver.get(f"https://www.google.com/search?q={requests.utils.quote(query)}")
-    time.sleep(1)
-    
-    # Extrai o texto da página de resultados
-    page_text = driver.page_source
-    soup = BeautifulSoup(page_text, 'html.parser')
-    text = soup.get_text(' ')
+    # Realiza a busca no Google e procura o CEP direto no HTML
+    page_text = obter_pagina_busca(f"https://www.google.com/search?q={requests.utils.quote(query)}", driver, logger)
+    alguma_pagina = bool(page_text)
+    cep = cep_mais_frequente(page_text)
     
-    # Procura por padrões de CEP no texto
-    ceps = PATTERNS['cep'].findall(text)
-    
-    if ceps:
-        cep = formatar_cep(ceps[0])
+    if cep:
         logger.info(f"CEP encontrado via Google: {cep}")
         
-        # Salva no cache
-        CEP_CACHE[chave_cache] = {"cep": cep}
-        salvar_cache_cep(CEP_CACHE)
-        
         return cep
     
     # Tenta uma segunda busca com formato alternativo
     query = f"{rua}, {cidade} CEP"
     logger.info(f"Segunda tentativa via Google: {query}")
-    driver.get(f"https://www.google.com/search?q={requests.utils.quote(query)}")
-    time.sleep(1)
+    page_text = obter_pagina_busca(f"https://www.google.com/search?q={requests.utils.quote(query)}", driver, logger)
+    alguma_pagina = alguma_pagina or bool(page_text)
+    cep = cep_mais_frequente(page_text)
     
-    page_text = driver.page_source
-    soup = BeautifulSoup(page_text, 'html.parser')
-    text = soup.get_text(' ')
-    ceps = PATTERNS['cep'].findall(text)
-    
-    if ceps:
-        cep = formatar_cep(ceps[0])
+    if cep:
         logger.info(f"CEP encontrado na segunda tentativa via Google: {cep}")
         
-        # Salva no cache
-        CEP_CACHE[chave_cache] = {"cep": cep}
-        salvar_cache_cep(CEP_CACHE)
-        
         return cep
     
+    # Nenhuma das buscas trouxe página: o Google não respondeu, o que não é um "não encontrado"
+    if not alguma_pagina:
+        logger.warning("Google não respondeu à busca de CEP")
+        return CEP_SEM_RESPOSTA
+    
     logger.warning("CEP não encontrado via Google")
     return ""
 
+def colunas_tabela_correios(page_text):
+    """Textos das colunas da primeira linha de resultado da tabela dos Correios (ou lista vazia)"""
+    # Sem a tabela na página não vale montar a árvore
+    if 'tmptabela' not in page_text:
+        return []
+    # Primeira linha é o cabeçalho
+    if LexborHTMLParser is not None:
+        linhas = LexborHTMLParser(page_text).css("table.tmptabela tr")
+        colunas = [td.text(strip=True) for td in linhas[1].css("td")] if len(linhas) > 1 else []
+    elif lxml is not None:
+        linhas = lxml.html.fromstring(page_text).xpath("//table[contains(@class, 'tmptabela')]//tr")
+        colunas = [td.text_content().strip() for td in linhas[1].xpath("./td")] if len(linhas) > 1 else []
+    else:
+        linhas = BeautifulSoup(page_text, BS_PARSER).select("table.tmptabela tr")
+        colunas = [td.get_text(strip=True) for td in linhas[1].select("td")] if len(linhas) > 1 else []
+    return colunas if len(colunas) >= 4 else []
+
+@cache_cep(lambda rua, cidade, uf, *_: gerar_chave_cache(rua, cidade, uf))
 def buscar_cep_via_correios(rua, cidade, uf, driver, logger):
     """Busca CEP no site dos Correios"""
     if not rua or not cidade:
         logger.warning("Rua ou cidade não disponíveis para busca de CEP nos Correios")
         return None
     
-    # Verifica no cache primeiro
-    chave_cache = gerar_chave_cache(rua, cidade, uf)
-    if chave_cache in CEP_CACHE:
-        logger.info(f"CEP encontrado no cache: {CEP_CACHE[chave_cache]}")
-        return CEP_CACHE[chave_cache]
-    
     logger.info(f"Buscando CEP nos Correios: {rua}, {cidade}, {uf}")
     
+    # Tenta primeiro o endpoint JSON usado pelo próprio site (sem navegador)
+    try:
+        r = obter_sessao().post(
+            CORREIOS_API_URL,
+            data={"pagina": "/app/endereco/index.php", "endereco": f"{rua}, {cidade}/{uf}", "tipoCEP": "ALL"},
+            timeout=10
+        )
+        resposta = r.json()
+        dados = resposta.get("dados") or []
+        if dados:
+            dados = dados[0]
+            result = {
+                "cep": formatar_cep(dados.get("cep", "")),
+                "logradouro": dados.get("logradouroDNEC", ""),
+                "bairro": dados.get("bairro", ""),
+                "localidade": dados.get("localidade", "") or cidade,
+                "uf": dados.get("uf", "") or uf,
+                "complemento": ""
+            }
+            logger.info(f"CEP encontrado nos Correios (API): {result}")
+            return result
+        if not resposta.get("erro"):
+            logger.warning("CEP não encontrado nos Correios")
+            return None
+        logger.info(f"API dos Correios retornou erro ({resposta.get('mensagem', '')}); tentando pelo site")
+    except Exception as e:
+        logger.warning(f"Erro na API dos Correios: {e}; tentando pelo site")
+    
+    # A API não respondeu de forma conclusiva e não há navegador para tentar o site
+    if driver is None:
+        return CEP_SEM_RESPOSTA
+    
     try:
         # Acessa o site dos Correios
         driver.get(CORREIOS_URL)
-        time.sleep(2)
         
         # Preenche o formulário
         try:
-            # Seleciona o tipo de busca por endereço
-            driver.find_element(By.ID, "endereco").click()
-            time.sleep(1)
+            # Seleciona o tipo de busca por endereço (assim que o campo puder ser clicado)
+            WebDriverWait(driver, CORREIOS_ESPERA_MAX).until(
+                EC.element_to_be_clickable((By.ID, "endereco"))
+            ).click()
             
             # Preenche o campo de endereço
             endereco_input = driver.find_element(By.ID, "endereco")
@@ -926,48 +1586,43 @@ def buscar_cep_via_correios(rua, cidade, uf, driver, logger):
             
             # Clica no botão de busca
             driver.find_element(By.ID, "btn_pesquisar").click()
-            time.sleep(3)
+            
+            # Espera a tabela de resultados ou a mensagem de "não encontrado"
+            try:
+                WebDriverWait(driver, CORREIOS_ESPERA_MAX).until(EC.any_of(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "table.tmptabela")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ".ctrlcontent .mensagem-resultado"))
+                ))
+            except TimeoutException:
+                logger.warning("Correios não responderam a tempo; usando a página como está")
+                respondeu = False
+            else:
+                respondeu = True
             
             # Extrai os resultados
             page_text = driver.page_source
-            soup = BeautifulSoup(page_text, 'html.parser')
             
             # Procura pela tabela de resultados
-            tabela = soup.select_one("table.tmptabela")
-            if tabela:
-                # Extrai as linhas da tabela
-                linhas = tabela.select("tr")
+            colunas = colunas_tabela_correios(page_text)
+            if colunas:
+                logradouro, bairro, localidade, cep = colunas[:4]
                 
-                if len(linhas) > 1:  # Primeira linha é o cabeçalho
-                    # Extrai os dados da primeira linha de resultado
-                    colunas = linhas[1].select("td")
-                    
-                    if len(colunas) >= 4:
-                        logradouro = colunas[0].get_text(strip=True)
-                        bairro = colunas[1].get_text(strip=True)
-                        localidade = colunas[2].get_text(strip=True)
-                        cep = colunas[3].get_text(strip=True)
-                        
-                        # Formata o CEP
-                        cep = formatar_cep(cep)
-                        
-                        # Cria o resultado no formato do ViaCEP
-                        result = {
-                            "cep": cep,
-                            "logradouro": logradouro,
-                            "bairro": bairro,
-                            "localidade": localidade.split('/')[0].strip(),
-                            "uf": localidade.split('/')[-1].strip() if '/' in localidade else uf,
-                            "complemento": ""
-                        }
-                        
-                        logger.info(f"CEP encontrado nos Correios: {result}")
-                        
-                        # Salva no cache
-                        CEP_CACHE[chave_cache] = result
-                        salvar_cache_cep(CEP_CACHE)
-                        
-                        return result
+                # Formata o CEP
+                cep = formatar_cep(cep)
+                
+                # Cria o resultado no formato do ViaCEP
+                result = {
+                    "cep": cep,
+                    "logradouro": logradouro,
+                    "bairro": bairro,
+                    "localidade": localidade.split('/')[0].strip(),
+                    "uf": localidade.split('/')[-1].strip() if '/' in localidade else uf,
+                    "complemento": ""
+                }
+                
+                logger.info(f"CEP encontrado nos Correios: {result}")
+                
+                return result
             
             # Procura por CEPs na página
             ceps = PATTERNS['cep'].findall(page_text)
@@ -985,50 +1640,47 @@ def buscar_cep_via_correios(rua, cidade, uf, driver, logger):
                     "complemento": ""
                 }
                 
-                # Salva no cache
-                CEP_CACHE[chave_cache] = result
-                salvar_cache_cep(CEP_CACHE)
-                
                 return result
+            
+            # Sem resultado e sem a página de resposta carregada: não dá para concluir que não há CEP
+            if not respondeu:
+                return CEP_SEM_RESPOSTA
         except Exception as e:
             logger.error(f"Erro ao interagir com o site dos Correios: {e}")
+            return CEP_SEM_RESPOSTA
         
         logger.warning("CEP não encontrado nos Correios")
         return None
     except Exception as e:
         logger.error(f"Erro ao buscar CEP nos Correios: {e}")
-        return None
+        return CEP_SEM_RESPOSTA
 
+@cache_cep(lambda cidade, uf, *_: gerar_chave_cache("", cidade, uf))
 def obter_cep_geral_cidade(cidade, uf, logger):
     """Obtém o CEP geral da cidade como último recurso"""
     if not cidade or not uf:
         logger.warning("Cidade ou UF não disponíveis para busca de CEP geral")
         return None
     
-    # Verifica no cache primeiro
-    chave_cache = gerar_chave_cache("", cidade, uf)
-    if chave_cache in CEP_CACHE:
-        logger.info(f"CEP geral encontrado no cache: {CEP_CACHE[chave_cache]}")
-        return CEP_CACHE[chave_cache]
-    
     # Formata a query de busca
     query = f"CEP geral de {cidade} {uf}"
     logger.info(f"Buscando CEP geral da cidade: {query}")
     
     try:
         # Faz a busca no Google
-        response = requests.get(
+        response = obter_sessao().get(
             "https://www.google.com/search",
             params={"q": query},
-            headers={"User-Agent": USER_AGENT},
             timeout=10
         )
+        if response.status_code != 200:
+            logger.warning(f"Busca do CEP geral falhou (HTTP {response.status_code})")
+            return CEP_SEM_RESPOSTA
         
-        # Extrai CEPs do resultado
-        ceps = PATTERNS['cep'].findall(response.text)
+        # Extrai o CEP mais citado direto do HTML
+        cep = cep_mais_frequente(response.text)
         
-        if ceps:
-            cep = formatar_cep(ceps[0])
+        if cep:
             logger.info(f"CEP geral encontrado: {cep}")
             
             # Cria um resultado simplificado
@@ -1041,17 +1693,13 @@ def obter_cep_geral_cidade(cidade, uf, logger):
                 "complemento": ""
             }
             
-            # Salva no cache
-            CEP_CACHE[chave_cache] = result
-            salvar_cache_cep(CEP_CACHE)
-            
             return result
         
         logger.warning("CEP geral não encontrado")
         return None
     except Exception as e:
         logger.error(f"Erro ao buscar CEP geral: {e}")
-        return None
+        return CEP_SEM_RESPOSTA
 
 def buscar_cep_com_cascata(rua, cidade, uf, driver, logger):
     """Busca CEP usando sistema de cascata de fallbacks"""
@@ -1059,52 +1707,67 @@ def buscar_cep_com_cascata(rua, cidade, uf, driver, logger):
         logger.warning("Dados insuficientes para busca de CEP")
         return None
     
+    # Endereço que já passou por toda a cascata sem CEP há pouco tempo
+    chave = gerar_chave_cache(rua, cidade, uf)
+    if falhou_recentemente('cascata', chave):
+        logger.info(f"Cascata já falhou recentemente para {chave}; pulando")
+        return None
+    
     logger.info(f"Iniciando busca de CEP em cascata para: {rua}, {cidade}, {uf}")
     
-    # 1. Tenta ViaCEP (método principal)
-    logger.info("Método 1: ViaCEP API")
-    viacep_data = buscar_dados_via_viacep(rua, cidade, uf, logger)
-    if viacep_data and viacep_data.get('cep'):
-        logger.info(f"CEP encontrado via ViaCEP: {viacep_data['cep']}")
-        return viacep_data
-    
-    # 2. Tenta BrasilAPI (primeiro fallback)
-    logger.info("Método 2: BrasilAPI")
-    brasilapi_data = buscar_cep_via_brasilapi(rua, cidade, uf, logger)
-    if brasilapi_data and brasilapi_data.get('cep'):
-        logger.info(f"CEP encontrado via BrasilAPI: {brasilapi_data['cep']}")
-        return brasilapi_data
-    
-    # 3. Tenta Web Scraping do Google (segundo fallback)
-    logger.info("Método 3: Web Scraping do Google")
-    google_cep = buscar_cep_por_endereco(rua, cidade, driver, logger)
-    if google_cep:
-        logger.info(f"CEP encontrado via Google: {google_cep}")
-        return {
-            "cep": google_cep,
-            "logradouro": rua,
-            "bairro": "",
-            "localidade": cidade,
-            "uf": uf,
-            "complemento": ""
+    # 1 e 2. ViaCEP e BrasilAPI ao mesmo tempo; o CEP geral da cidade (método 5) já vai
+    # sendo buscado em paralelo, mas só é usado se os métodos mais precisos falharem.
+    # Nenhuma dessas buscas usa o driver.
+    executor = ThreadPoolExecutor(max_workers=3)
+    try:
+        futuros = {
+            executor.submit(buscar_dados_via_viacep, rua, cidade, uf, logger): "ViaCEP",
+            executor.submit(buscar_cep_via_brasilapi, rua, cidade, uf, logger): "BrasilAPI",
         }
-    
-    # 4. Tenta Site dos Correios (terceiro fallback)
-    logger.info("Método 4: Site dos Correios")
-    correios_data = buscar_cep_via_correios(rua, cidade, uf, driver, logger)
-    if correios_data and correios_data.get('cep'):
-        logger.info(f"CEP encontrado via Correios: {correios_data['cep']}")
-        return correios_data
-    
-    # 5. Tenta CEP geral da cidade (último recurso)
-    logger.info("Método 5: CEP geral da cidade")
-    cep_geral = obter_cep_geral_cidade(cidade, uf, logger)
-    if cep_geral and cep_geral.get('cep'):
-        logger.info(f"CEP geral encontrado: {cep_geral['cep']}")
-        return cep_geral
-    
-    logger.warning("Nenhum CEP encontrado após tentar todos os métodos")
-    return None
+        futuro_geral = executor.submit(obter_cep_geral_cidade, cidade, uf, logger)
+        
+        logger.info("Métodos 1 e 2: ViaCEP e BrasilAPI em paralelo")
+        for futuro in as_completed(futuros):
+            dados = futuro.result()
+            if dados and dados.get('cep'):
+                logger.info(f"CEP encontrado via {futuros[futuro]}: {dados['cep']}")
+                futuro_geral.cancel()
+                return dados
+        
+        # 3. Tenta Web Scraping do Google (segundo fallback)
+        logger.info("Método 3: Web Scraping do Google")
+        google_cep = buscar_cep_por_endereco(rua, cidade, driver, logger)
+        if google_cep:
+            logger.info(f"CEP encontrado via Google: {google_cep}")
+            return {
+                "cep": google_cep,
+                "logradouro": rua,
+                "bairro": "",
+                "localidade": cidade,
+                "uf": uf,
+                "complemento": ""
+            }
+        
+        # 4. Tenta Site dos Correios (terceiro fallback)
+        logger.info("Método 4: Site dos Correios")
+        correios_data = buscar_cep_via_correios(rua, cidade, uf, driver, logger)
+        if correios_data and correios_data.get('cep'):
+            logger.info(f"CEP encontrado via Correios: {correios_data['cep']}")
+            return correios_data
+        
+        # 5. Usa o CEP geral da cidade (último recurso)
+        logger.info("Método 5: CEP geral da cidade")
+        cep_geral = futuro_geral.result()
+        if cep_geral and cep_geral.get('cep'):
+            logger.info(f"CEP geral encontrado: {cep_geral['cep']}")
+            return cep_geral
+        
+        logger.warning("Nenhum CEP encontrado após tentar todos os métodos")
+        registrar_falha_cep('cascata', chave)
+        return None
+    finally:
+        # Não espera buscas que perderam a corrida
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def log_memory_usage(logger, prefix=""):
     """Registra o uso de memória atual"""
@@ -1117,6 +1780,9 @@ def log_execution_time(logger, start_time, operation_name):
     elapsed = time.time() - start_time
     logger.info(f"Tempo de execução de {operation_name}: {elapsed:.2f} segundos")
 
+# Candidatos por campo que bastam para parar de ler URLs
+MIN_CANDIDATOS_PARADA = {'address': 3, 'phone': 3, 'email': 1}
+
 def process_medico(m, driver, logger):
     """Processa um médico"""
     start_time = time.time()
@@ -1136,56 +1802,72 @@ def process_medico(m, driver, logger):
         urls_bing, bing_text = search_bing(query, driver, logger)
         log_memory_usage(logger, "Após Bing")
         
-        # Combina URLs únicas
-        all_urls = list(set(urls_searx + urls_google + urls_bing))
+        # Combina URLs únicas, sem rastreamento e sem domínios que nunca trazem dados
+        all_urls = filtrar_urls(urls_searx + urls_google + urls_bing)
         logger.info(f"Total de URLs únicas: {len(all_urls)}")
         
-        # Coleta candidatos
-        all_candidates = []
+        # Baixa todas as páginas de uma vez; o Chrome só abre as que precisam de JavaScript
+        htmls = baixar_htmls(all_urls, logger)
+        log_memory_usage(logger, "Após downloads")
+        
+        # Coleta e agrega candidatos, na ordem de relevância das buscas
+        aggregated = defaultdict(list)
+        paginas_lidas = 0
         for i, url in enumerate(all_urls):
             logger.info(f"Processando URL {i+1}/{len(all_urls)}: {url}")
-            html = download_html(url, logger, driver)
+            html = htmls.pop(url, '')
+            if precisa_renderizar(html):
+                html = download_html(url, logger, driver)
+            else:
+                save_debug_html(url, html, logger)
             if html:
-                candidates = extract_candidates(html, url, logger)
-                all_candidates.append(candidates)
-            log_memory_usage(logger, f"Após processar URL {i+1}")
+                paginas_lidas += 1
+                for k, v in extract_candidates(html, url, logger).items():
+                    if v:
+                        aggregated[k].extend(v)
+            if (i + 1) % 5 == 0:
+                log_memory_usage(logger, f"Após processar URL {i+1}")
+            
+            # Já há candidatos suficientes de endereço, telefone e e-mail: dispensa as URLs restantes
+            if all(len(aggregated[k]) >= n for k, n in MIN_CANDIDATOS_PARADA.items()):
+                logger.info(f"Candidatos suficientes após {i+1}/{len(all_urls)} URLs; encerrando a coleta")
+                break
         
-        # Agrega e ranqueia
-        if all_candidates:
+        # Ranqueia
+        if paginas_lidas:
             logger.info("Iniciando agregação e ranqueamento")
-            aggregated = {}
-            for k in all_candidates[0].keys():
-                aggregated[k] = []
-                for c in all_candidates:
-                    aggregated[k].extend(c.get(k, []))
-            
             ranked = aggregate_and_rank(aggregated, logger)
             log_memory_usage(logger, "Após agregação")
             
             # Cria resultado mantendo todas as colunas originais
             result = m.copy()
             
+            # Valida todos os campos com uma única chamada à IA (por campo, se ela falhar)
+            logger.info("Validando campos")
+            cands_by_field = {
+                field: ranked[field][:3]
+                for field in ('address', 'phone', 'email', 'complement')
+                if ranked.get(field)
+            }
+            validados = validate_all(cands_by_field, m, logger)
+            if validados is None:
+                validados = {field: validate(field, cands, m, logger) for field, cands in cands_by_field.items()}
+            
             # Mapeia os campos encontrados para os campos corretos
-            if ranked.get('address'):
-                logger.info("Validando endereço")
-                endereco_completo = validate('address', ranked['address'][:3], m, logger)
-                if endereco_completo:
-                    # Extrai o número do endereço
-                    endereco_sem_numero, numero = extrair_numero_endereco(endereco_completo)
-                    result['Address A1'] = endereco_sem_numero
-                    result['Numero A1'] = numero
+            if validados.get('address'):
+                # Extrai o número do endereço
+                endereco_sem_numero, numero = extrair_numero_endereco(validados['address'])
+                result['Address A1'] = endereco_sem_numero
+                result['Numero A1'] = numero
             
-            if ranked.get('phone'):
-                logger.info("Validando telefone")
-                result['Phone A1'] = validate('phone', ranked['phone'][:3], m, logger)
+            if 'phone' in validados:
+                result['Phone A1'] = validados['phone']
             
-            if ranked.get('email'):
-                logger.info("Validando email")
-                result['E-mail A1'] = validate('email', ranked['email'][:3], m, logger)
+            if 'email' in validados:
+                result['E-mail A1'] = validados['email']
             
-            if ranked.get('complement'):
-                logger.info("Validando complemento")
-                result['Complement A1'] = validate('complement', ranked['complement'][:3], m, logger)
+            if 'complement' in validados:
+                result['Complement A1'] = validados['complement']
             
             # Descobre a cidade
             if result.get('Address A1') and not result.get('City A1'):
@@ -1235,82 +1917,119 @@ def process_medico(m, driver, logger):
     
     return None
 
-def process_batch(batch_id, medicos_batch, output_file, fieldnames, progress_dict, lock):
-    """Processa um lote de médicos"""
-    logger = setup_logger(batch_id)
-    driver = None
-    batch_start_time = time.time()
+# Estado de cada worker do pool, preparado em setup_worker
+_WORKER_LOGGER = None
+_WORKER_DRIVER = None
+_WORKER_CONTADOR = 0
+
+def _fechar_driver():
+    """Fecha o driver do worker, se houver"""
+    global _WORKER_DRIVER
+    if _WORKER_DRIVER:
+        try:
+            _WORKER_DRIVER.quit()
+        except:
+            pass
+        _WORKER_DRIVER = None
+
+def _limpar_driver():
+    """Apaga cookies e volta para about:blank entre médicos, liberando a página anterior"""
+    if not _WORKER_DRIVER or not _WORKER_DRIVER.iniciado:
+        return
+    try:
+        _WORKER_DRIVER.delete_all_cookies()
+        _WORKER_DRIVER.get('about:blank')
+    except Exception:
+        # Driver travado ou morto: descarta e deixa o próximo médico criar outro
+        _fechar_driver()
+
+def setup_worker(log_queue):
+    """Inicializa o worker do pool: logger, sessão HTTP e driver do Chrome (aberto sob demanda), reaproveitados entre médicos"""
+    global _WORKER_LOGGER, _WORKER_DRIVER
+    _WORKER_LOGGER = setup_logger(os.getpid(), log_queue)
+    obter_sessao()
+    _WORKER_DRIVER = DriverSobDemanda()
+    # Objetos criados até aqui (módulo, regex, listas, sessão) vivem o worker inteiro:
+    # congela-os para a coleta automática não percorrê-los, e coleta com menos frequência
+    gc.set_threshold(700 * 5, 10, 10)
+    gc.collect()
+    gc.freeze()
+    # Fecha o Chrome quando o pool encerra o worker (pool.close() + pool.join())
+    Finalize(None, _fechar_driver, exitpriority=10)
+
+def process_medico_worker(medico):
+    """Processa um médico no worker e retorna o resultado (None se falhar)"""
+    global _WORKER_DRIVER, _WORKER_CONTADOR
+    logger = _WORKER_LOGGER
+    medico_start_time = time.time()
     
     try:
-        results = []
-        for i, medico in enumerate(medicos_batch):
-            try:
-                medico_start_time = time.time()
-                logger.info(f"\n{'='*50}\nProcessando médico {i+1}/{len(medicos_batch)}")
-                logger.info(f"Nome: {medico.get('Firstname', '')} {medico.get('LastName', '')}")
-                
-                # Reinicia o driver a cada 10 médicos para evitar vazamento de memória
-                if i % 10 == 0:
-                    if driver:
-                        try:
-                            driver.quit()
-                        except:
-                            pass
-                    logger.info("Reiniciando driver do Chrome")
-                    driver = make_driver()
-                    log_memory_usage(logger, "Após reiniciar driver")
-                
-                result = process_medico(medico, driver, logger)
-                if result:
-                    results.append(result)
-                
-                # Salva resultados a cada 5 médicos para evitar perda de dados
-                if len(results) >= 5:
-                    logger.info("Salvando lote de resultados")
-                    with open(output_file, 'a', newline='', encoding='utf-8') as f:
-                        writer = csv.DictWriter(f, fieldnames=fieldnames)
-                        writer.writerows(results)
-                    results = []
-                    log_memory_usage(logger, "Após salvar resultados")
-                
-                # Atualiza progresso
-                with lock:
-                    progress_dict['processed'] += 1
-                    progress = (progress_dict['processed'] / progress_dict['total']) * 100
-                    logger.info(f"Progresso: {progress:.1f}%")
-                
-                # Força coleta de lixo
-                if i % 5 == 0:
-                    logger.info("Executando coleta de lixo")
-                    import gc
-                    gc.collect()
-                    log_memory_usage(logger, "Após coleta de lixo")
-                
-                log_execution_time(logger, medico_start_time, f"processamento do médico {i+1}")
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar médico {medico.get('Firstname', '')} {medico.get('LastName', '')}: {e}")
-                logger.error(traceback.format_exc())
-                continue
+        logger.info(f"\n{'='*50}\nProcessando médico {_WORKER_CONTADOR+1} deste worker")
+        logger.info(f"Nome: {medico.get('Firstname', '')} {medico.get('LastName', '')}")
         
-        # Salva resultados finais do lote
-        if results:
-            logger.info("Salvando resultados finais do lote")
-            with open(output_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writerows(results)
+        # Reinicia o driver a cada 10 médicos para evitar vazamento de memória
+        # (e recria o driver se ele tiver falhado antes)
+        if _WORKER_DRIVER is None:
+            _WORKER_DRIVER = DriverSobDemanda()
+        elif _WORKER_CONTADOR and _WORKER_CONTADOR % 10 == 0 and _WORKER_DRIVER.iniciado:
+            logger.info("Reiniciando driver do Chrome")
+            _fechar_driver()
+            _WORKER_DRIVER = DriverSobDemanda()
+            # Só a geração jovem: os objetos do driver antigo acabaram de virar lixo
+            gc.collect(1)
+            log_memory_usage(logger, "Após reiniciar driver")
         
-        log_execution_time(logger, batch_start_time, "processamento do lote completo")
+        result = process_medico(medico, _WORKER_DRIVER, logger)
         
+        log_execution_time(logger, medico_start_time, "processamento do médico")
+    
     except Exception as e:
-        logger.error(f"Erro no lote {batch_id}: {e}")
+        logger.error(f"Erro ao processar médico {medico.get('Firstname', '')} {medico.get('LastName', '')}: {e}")
         logger.error(traceback.format_exc())
+        result = None
+    
     finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+        _WORKER_CONTADOR += 1
+        _limpar_driver()
+        avancar_pausa_ollama()
+    
+    return result
+
+# Estrutura de saída desejada
+FIELDNAMES = [
+    'Hash', 'CRM', 'UF', 'Firstname', 'LastName', 'Medical specialty',
+    'Endereco Completo A1', 'Address A1', 'Numero A1', 'Complement A1',
+    'Bairro A1', 'postal code A1', 'City A1', 'State A1',
+    'Phone A1', 'Phone A2', 'Cell phone A1', 'Cell phone A2',
+    'E-mail A1', 'E-mail A2', 'OPT-IN', 'STATUS', 'LOTE'
+]
+
+def ler_medicos(inp):
+    """Lê o CSV de entrada como lista de dicts de strings (com pyarrow, se disponível)"""
+    if pacsv is not None:
+        # Todas as colunas como texto e vazio como '', igual ao csv.DictReader
+        # (utf-8-sig: com BOM, o nome da primeira coluna não ganha o \ufeff e não escapa do column_types)
+        with open(inp, 'r', encoding='utf-8-sig') as f:
+            colunas = next(csv.reader(f), [])
+        try:
+            tabela = pacsv.read_csv(
+                inp,
+                read_options=pacsv.ReadOptions(use_threads=True),
+                convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in colunas}, strings_can_be_null=False)
+            )
+            return tabela.to_pylist()
+        except pa.ArrowInvalid as e:
+            # Linhas com campos faltando (que o DictReader tolera)
+            print(f"pyarrow não leu {inp} ({e}); usando o csv.DictReader")
+    
+    with open(inp, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+# Quantas linhas escrever no CSV de saída entre uma descarga e outra
+CSV_FLUSH_A_CADA = 20
+
+# Máximo de médicos por lote enviado a um worker do pool
+LOTE_MAXIMO_WORKER = 10
 
 def run_parallel(inp, outp, num_processes=None):
     """Executa o processamento em paralelo"""
@@ -1318,45 +2037,55 @@ def run_parallel(inp, outp, num_processes=None):
         num_processes = NUM_PROCESSES
     
     # Lê os médicos
-    with open(inp, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        medicos = list(reader)
-    
-    # Define a estrutura de saída desejada
-    fieldnames = [
-        'Hash', 'CRM', 'UF', 'Firstname', 'LastName', 'Medical specialty',
-        'Endereco Completo A1', 'Address A1', 'Numero A1', 'Complement A1',
-        'Bairro A1', 'postal code A1', 'City A1', 'State A1',
-        'Phone A1', 'Phone A2', 'Cell phone A1', 'Cell phone A2',
-        'E-mail A1', 'E-mail A2', 'OPT-IN', 'STATUS', 'LOTE'
-    ]
-    
-    # Prepara o arquivo de saída
-    with open(outp, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-    
-    # Divide em lotes menores para melhor gerenciamento de memória
-    batch_size = min(50, math.ceil(len(medicos) / num_processes))
-    batches = [medicos[i:i + batch_size] for i in range(0, len(medicos), batch_size)]
-    
-    # Configura o progresso
-    manager = Manager()
-    progress_dict = manager.dict()
-    progress_dict['processed'] = 0
-    progress_dict['total'] = len(medicos)
-    lock = manager.Lock()
-    
-    # Processa em paralelo com timeout
-    with Pool(num_processes) as pool:
-        args = [(i, batch, outp, fieldnames, progress_dict, lock) for i, batch in enumerate(batches)]
-        try:
-            pool.starmap(process_batch, args, chunksize=1)
-        except Exception as e:
-            print(f"Erro no processamento paralelo: {e}")
-            pool.terminate()
-            pool.join()
-            raise
+    medicos = ler_medicos(inp)
+    
+    total = len(medicos)
+    processados = 0
+    
+    # Traz o cache de CEP do formato antigo, se existir, e descarta o que venceu
+    importar_cache_cep_json()
+    compactar_cache_cep()
+    fechar_cache_cep()
+    
+    # Tamanho dos lotes enviados a cada worker (heurística N / (processos + 2)), limitado a
+    # LOTE_MAXIMO_WORKER: cada médico leva de segundos a minutos e o imap_unordered só devolve
+    # um lote quando ele termina inteiro, então lotes grandes deixariam o CSV parado por horas
+    # (e perderiam todo o lote se o worker caísse)
+    chunksize = min(max(1, total // (num_processes + 2)), LOTE_MAXIMO_WORKER)
+    
+    # Logs de todos os workers num único arquivo, gravado pelo processo principal
+    log_queue, log_listener = iniciar_log_central()
+    
+    # Um único pool para todo o programa; os resultados voltam pelo retorno das tarefas
+    # e só o processo principal escreve o CSV
+    pool = Pool(num_processes, initializer=setup_worker, initargs=(log_queue,))
+    try:
+        with open(outp, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDNAMES)
+            
+            escritos = 0
+            for result in pool.imap_unordered(process_medico_worker, medicos, chunksize=chunksize):
+                if result:
+                    writer.writerow([result.get(k, '') for k in FIELDNAMES])
+                    escritos += 1
+                    # Descarrega o buffer em lotes, para o arquivo não ficar muito atrás em execuções longas
+                    if escritos % CSV_FLUSH_A_CADA == 0:
+                        f.flush()
+                
+                # Atualiza progresso
+                processados += 1
+                print(f"Progresso: {processados / total * 100:.1f}%")
+        
+        pool.close()
+        pool.join()
+    except Exception as e:
+        print(f"Erro no processamento paralelo: {e}")
+        pool.terminate()
+        pool.join()
+        raise
+    finally:
+        log_listener.stop()
 
 if __name__ == '__main__':
     if len(sys.argv) != 3: